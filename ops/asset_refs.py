@@ -0,0 +1,224 @@
+"""
+Asset reference checks for Oriz
+Parses every HTML and CSS file in dist, resolves the local assets they
+reference (scripts, stylesheets, icons, images, url() and @import) against
+the dist manifest, and computes Subresource Integrity hashes
+"""
+
+import base64
+import posixpath
+import re
+import sys
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import unquote, urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import DIST_DIR
+from dist_manifest import DistFile, DistManifest, get_dist_manifest, invalidate_dist_manifest
+
+READ_SIZE = 64 * 1024
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)|@import\s+(['"])([^'"]+)\3""")
+
+# <link> rels that load an asset, in the order used to name the reference
+LINK_RELS = ('stylesheet', 'modulepreload', 'preload', 'icon', 'apple-touch-icon', 'mask-icon', 'manifest')
+
+# Tags whose resources browsers verify against an integrity attribute
+SRI_RELS = {'stylesheet', 'modulepreload', 'preload'}
+
+
+class Reference(NamedTuple):
+    source: str             # dist path of the referring file
+    url: str                # the reference as written
+    path: str | None        # resolved dist path, None when not local
+    kind: str               # script, stylesheet, icon, image, css-url, ...
+    tag: tuple | None       # (line, column, raw start tag) for SRI-capable tags
+
+
+def resolve(source: str, url: str) -> str | None:
+    """Map a reference in a dist file to a dist path, or None if it isn't local"""
+    parts = urlsplit(url.strip())
+    if parts.scheme or parts.netloc or not parts.path:
+        return None  # external, data:, mailto:, //cdn or a bare #fragment
+
+    path = unquote(parts.path)
+    if path.startswith('/'):
+        resolved = posixpath.normpath(path.lstrip('/'))
+    else:
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+
+    if resolved.startswith('../') or resolved == '..':
+        return None
+    if resolved == '.' or path.endswith('/'):
+        resolved = posixpath.join('' if resolved == '.' else resolved, 'index.html')
+    return resolved
+
+
+def _css_urls(text: str) -> list[str]:
+    return [m.group(2) or m.group(4) for m in CSS_URL.finditer(text)]
+
+
+class _ReferenceParser(HTMLParser):
+    """Collects asset references from an HTML document fed in chunks"""
+
+    def __init__(self, source: str):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.references: list[Reference] = []
+        self._in_style = False
+
+    def _add(self, url: str, kind: str, tag: tuple | None = None):
+        self.references.append(Reference(self.source, url, resolve(self.source, url), kind, tag))
+
+    def handle_starttag(self, name, attrs):
+        attrs = dict(attrs)
+        position = (*self.getpos(), self.get_starttag_text())
+
+        if name == 'script' and attrs.get('src'):
+            self._add(attrs['src'], 'script', position)
+        elif name == 'link' and attrs.get('href'):
+            rels = set((attrs.get('rel') or '').lower().split())
+            kind = next((rel for rel in LINK_RELS if rel in rels), None)
+            if kind:
+                self._add(attrs['href'], kind, position if kind in SRI_RELS else None)
+        elif name in ('img', 'source', 'video', 'audio', 'track', 'input'):
+            for attr in ('src', 'poster'):
+                if attrs.get(attr):
+                    self._add(attrs[attr], 'image' if name in ('img', 'input') else 'media')
+            if attrs.get('srcset'):
+                for candidate in attrs['srcset'].split(','):
+                    if candidate.strip():
+                        self._add(candidate.split()[0], 'image')
+
+        if attrs.get('style'):
+            for url in _css_urls(attrs['style']):
+                self._add(url, 'css-url')
+        self._in_style = name == 'style'
+
+    def handle_endtag(self, name):
+        self._in_style = False
+
+    def handle_data(self, data):
+        if self._in_style:
+            for url in _css_urls(data):
+                self._add(url, 'css-url')
+
+
+def _read_chunks(f: DistFile):
+    with open(f.abs_path, encoding='utf-8', errors='replace', newline='') as fh:
+        while chunk := fh.read(READ_SIZE):
+            yield chunk
+
+
+def parse_file(f: DistFile) -> list[Reference]:
+    """References made by one HTML or CSS file"""
+    if f.ext in ('.html', '.htm'):
+        parser = _ReferenceParser(f.path)
+        for chunk in _read_chunks(f):
+            parser.feed(chunk)
+        parser.close()
+        return parser.references
+
+    # CSS: url() and @import never span more than a line, so carry the
+    # unfinished tail of each chunk into the next one
+    references = []
+    tail = ''
+    for chunk in _read_chunks(f):
+        text = tail + chunk
+        cut = text.rfind('\n') + 1
+        text, tail = text[:cut], text[cut:]
+        references.extend(Reference(f.path, url, resolve(f.path, url), 'css-url', None)
+                          for url in _css_urls(text))
+    references.extend(Reference(f.path, url, resolve(f.path, url), 'css-url', None)
+                      for url in _css_urls(tail))
+    return references
+
+
+def collect_references(manifest: DistManifest) -> list[Reference]:
+    """Every reference made by the HTML and CSS files in dist"""
+    references = []
+    for f in manifest:
+        if f.ext in ('.html', '.htm', '.css'):
+            references.extend(parse_file(f))
+    return references
+
+
+def find_missing(manifest: DistManifest, references: list[Reference]) -> list[Reference]:
+    """Local references that point at nothing in dist"""
+    return [r for r in references if r.path is not None and manifest.get(r.path) is None]
+
+
+def sri_hash(f: DistFile) -> str:
+    """Subresource Integrity value (sha384) for a dist file"""
+    return 'sha384-' + base64.b64encode(bytes.fromhex(f.digest('sha384'))).decode('ascii')
+
+
+def sri_hashes(manifest: DistManifest, references: list[Reference]) -> dict[str, str]:
+    """{dist path: integrity} for every local file loaded through an SRI-capable tag"""
+    hashes = {}
+    for r in references:
+        if r.tag and r.path and r.path not in hashes and manifest.get(r.path):
+            hashes[r.path] = sri_hash(manifest.get(r.path))
+    return hashes
+
+
+def inject_sri(manifest: DistManifest, references: list[Reference]) -> int:
+    """Add integrity attributes to script/link tags that lack them
+
+    Returns the number of tags changed. The dist manifest is invalidated
+    when any HTML file is rewritten.
+    """
+    hashes = sri_hashes(manifest, references)
+
+    by_source: dict[str, list[Reference]] = {}
+    for r in references:
+        if r.tag and r.path in hashes and 'integrity=' not in r.tag[2].lower():
+            by_source.setdefault(r.source, []).append(r)
+
+    changed = 0
+    for source, refs in by_source.items():
+        f = manifest.get(source)
+        with open(f.abs_path, encoding='utf-8', newline='') as fh:
+            text = fh.read()
+        # HTMLParser counts lines by '\n' only
+        line_starts = [0] + [i + 1 for i, c in enumerate(text) if c == '\n']
+
+        # Rewrite from the end so earlier offsets stay valid
+        for r in sorted(refs, key=lambda r: (r.tag[0], r.tag[1]), reverse=True):
+            line, column, raw = r.tag
+            start = line_starts[line - 1] + column
+            if text[start:start + len(raw)] != raw:
+                continue
+            added = f' integrity="{hashes[r.path]}"'
+            if 'crossorigin' not in raw.lower():
+                added += ' crossorigin="anonymous"'
+            close = len(raw) - (2 if raw.endswith('/>') else 1)
+            tag = raw[:close].rstrip() + added + raw[close:]
+            text = text[:start] + tag + text[start + len(raw):]
+            changed += 1
+
+        with open(f.abs_path, 'w', encoding='utf-8', newline='') as fh:
+            fh.write(text)
+
+    if changed:
+        invalidate_dist_manifest(manifest.root)
+    return changed
+
+
+def check_references(dist_dir: Path = DIST_DIR, sri: bool = False) -> dict:
+    """Parse dist and return {'references', 'missing'}
+
+    With sri, also 'sri' — hashing every script and stylesheet, so only
+    when the hashes are wanted.
+    """
+    manifest = get_dist_manifest(dist_dir)
+    references = collect_references(manifest)
+    result = {
+        'references': references,
+        'missing': find_missing(manifest, references),
+    }
+    if sri:
+        result['sri'] = sri_hashes(manifest, references)
+    return result
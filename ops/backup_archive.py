@@ -0,0 +1,212 @@
+"""
+Compressed backup archives for Oriz
+Writes a backup snapshot as tar.zst or tar.gz for offsite storage. The tar
+stream is cut into fixed-size chunks that are compressed independently on
+a thread pool, so memory stays constant and any single file can be
+restored by decompressing only the chunks that hold it.
+"""
+
+import bisect
+import json
+import sys
+import tarfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # optional: tar.gz is used instead
+    zstandard = None
+
+sys.path.insert(0, str(Path(__file__).parent))
+from backup_store import BACKUP_DIR, list_snapshots, load_snapshot, object_path
+
+ARCHIVES_DIR = BACKUP_DIR / 'archives'
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _compressor(codec: str, level: int | None):
+    """Return a function compressing one chunk into a standalone frame"""
+    if codec == 'zst':
+        cctx = zstandard.ZstdCompressor(level=level or 10)
+        return cctx.compress
+
+    def gzip_member(data: bytes) -> bytes:
+        # wbits=31 emits a complete gzip member; members concatenate into a valid .gz
+        c = zlib.compressobj(level or 6, zlib.DEFLATED, 31)
+        return c.compress(data) + c.flush()
+
+    return gzip_member
+
+
+def _decompress(codec: str, frame: bytes) -> bytes:
+    if codec == 'zst':
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return zlib.decompress(frame, 31)
+
+
+class _ChunkedWriter:
+    """File-like sink for tarfile: compresses fixed-size chunks in parallel
+
+    At most 2 × threads chunks are in flight, and frames are written to
+    the output in order as they complete.
+    """
+
+    def __init__(self, out, codec: str, threads: int, level: int | None, chunk_size: int):
+        self._out = out
+        self._compress = _compressor(codec, level)
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._max_pending = threads * 2
+        self._pending = deque()
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._position = 0
+        self._compressed_offset = 0
+        self.chunks = []  # [compressed offset, compressed length, uncompressed offset]
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self._chunk_size:
+            self._submit(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def _submit(self, chunk: bytes):
+        start = self._position - len(self._buffer)
+        self._pending.append((start, self._executor.submit(self._compress, chunk)))
+        while len(self._pending) > self._max_pending:
+            self._drain_one()
+
+    def _drain_one(self):
+        start, future = self._pending.popleft()
+        frame = future.result()
+        self._out.write(frame)
+        self.chunks.append([self._compressed_offset, len(frame), start])
+        self._compressed_offset += len(frame)
+
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._drain_one()
+        self._executor.shutdown()
+
+
+class _ChunkReader:
+    """Read-only stream over the decompressed archive starting at an offset"""
+
+    def __init__(self, archive: Path, index: dict, offset: int):
+        self._f = open(archive, 'rb')
+        self._codec = index['codec']
+        self._chunks = index['chunks']
+        self._next = bisect.bisect_right([c[2] for c in self._chunks], offset) - 1
+        self._data = b''
+        self._skip = offset - self._chunks[self._next][2]
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self._data) < size) and self._next < len(self._chunks):
+            c_offset, c_length, _ = self._chunks[self._next]
+            self._f.seek(c_offset)
+            data = _decompress(self._codec, self._f.read(c_length))
+            if self._skip:
+                data, self._skip = data[self._skip:], 0
+            self._data += data
+            self._next += 1
+
+        if size < 0:
+            size = len(self._data)
+        out, self._data = self._data[:size], self._data[size:]
+        return out
+
+    def close(self):
+        self._f.close()
+
+
+def write_archive(
+    snapshot_id: str | None = None,
+    codec: str | None = None,
+    threads: int = 4,
+    level: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Path:
+    """Archive a backup snapshot (default: the newest) and write its index
+
+    Returns the archive path; the index is stored next to it as
+    <archive>.index.json.
+    """
+    if snapshot_id is None:
+        snapshots = list_snapshots()
+        if not snapshots:
+            raise FileNotFoundError("No backup snapshots to archive")
+        snapshot_id = snapshots[-1]['id']
+
+    if codec is None:
+        codec = 'zst' if zstandard is not None else 'gz'
+    if codec == 'zst' and zstandard is None:
+        raise RuntimeError("tar.zst needs the zstandard package (pip install zstandard)")
+
+    snapshot = load_snapshot(snapshot_id)
+    mtime = datetime.fromisoformat(snapshot['created']).timestamp()
+
+    ARCHIVES_DIR.mkdir(parents=True, exist_ok=True)
+    archive = ARCHIVES_DIR / f"{snapshot_id}.tar.{codec}"
+    tmp = archive.with_name(archive.name + '.tmp')
+
+    files = {}
+    with open(tmp, 'wb') as out:
+        writer = _ChunkedWriter(out, codec, threads, level, chunk_size)
+        with tarfile.open(fileobj=writer, mode='w', format=tarfile.PAX_FORMAT) as tar:
+            for path, info in sorted(snapshot['files'].items()):
+                member = tarfile.TarInfo(path)
+                member.size = info['size']
+                member.mtime = mtime
+                member.mode = 0o644
+                files[path] = [tar.offset, info['size']]
+                with open(object_path(info['sha256']), 'rb') as f:
+                    tar.addfile(member, f)
+        writer.close()
+
+    tmp.replace(archive)
+
+    index = {
+        'snapshot': snapshot_id,
+        'codec': codec,
+        'chunk_size': chunk_size,
+        'chunks': writer.chunks,
+        'files': files,
+    }
+    index_path = archive.with_name(archive.name + '.index.json')
+    index_path.write_text(json.dumps(index), encoding='utf-8')
+    return archive
+
+
+def extract_file(archive: Path, path: str, dest: Path) -> Path:
+    """Restore one file from an archive, decompressing only its chunks"""
+    index_path = archive.with_name(archive.name + '.index.json')
+    index = json.loads(index_path.read_text(encoding='utf-8'))
+
+    if path not in index['files']:
+        raise KeyError(f"{path} is not in {archive.name}")
+    offset, _ = index['files'][path]
+
+    reader = _ChunkReader(archive, index, offset)
+    try:
+        with tarfile.open(fileobj=reader, mode='r|') as tar:
+            member = tar.next()
+            source = tar.extractfile(member)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with open(dest, 'wb') as out:
+                while chunk := source.read(1024 * 1024):
+                    out.write(chunk)
+    finally:
+        reader.close()
+
+    return dest
@@ -0,0 +1,178 @@
+"""
+Content-addressed backup store for Oriz
+Each file's contents are stored once under backups/objects/ by SHA-256;
+a snapshot is just a small JSON manifest pointing at those blobs
+"""
+
+import json
+import os
+import shutil
+import stat
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import PROJECT_ROOT, DIST_DIR, BACKUP_KEEP_LAST, BACKUP_KEEP_DAILY
+from dist_manifest import get_dist_manifest
+
+BACKUP_DIR = PROJECT_ROOT / 'backups'
+OBJECTS_DIR = BACKUP_DIR / 'objects'
+SNAPSHOTS_DIR = BACKUP_DIR / 'snapshots'
+INDEX_FILE = SNAPSHOTS_DIR / 'index.json'
+
+
+def object_path(sha256: str) -> Path:
+    """Where the blob for a SHA-256 lives in the store"""
+    return OBJECTS_DIR / sha256[:2] / sha256
+
+
+def _load_index() -> list[dict]:
+    try:
+        return json.loads(INDEX_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def _save_index(index: list[dict]):
+    SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = INDEX_FILE.with_suffix('.tmp')
+    tmp.write_text(json.dumps(index, indent=2), encoding='utf-8')
+    tmp.replace(INDEX_FILE)
+
+
+def list_snapshots() -> list[dict]:
+    """Return snapshot summaries (id, created, file_count, total_size), oldest first"""
+    return _load_index()
+
+
+def load_snapshot(snapshot_id: str) -> dict:
+    """Return a snapshot manifest: {'id', 'created', 'files': {path: {...}}}"""
+    return json.loads((SNAPSHOTS_DIR / f'{snapshot_id}.json').read_text(encoding='utf-8'))
+
+
+def create_snapshot(dist_dir: Path = DIST_DIR) -> dict | None:
+    """Snapshot dist, storing only blobs the store doesn't have yet
+
+    Returns the index entry for the snapshot, or the latest one unchanged
+    if dist is identical to it.
+    """
+    manifest = get_dist_manifest(dist_dir)
+    manifest.hash_all()
+
+    files = {
+        f.path: {'sha256': f.digest('sha256'), 'size': f.size}
+        for f in manifest
+    }
+
+    index = _load_index()
+    if index and load_snapshot(index[-1]['id'])['files'] == files:
+        return {**index[-1], 'unchanged': True}
+
+    new_blobs = 0
+    for f in manifest:
+        blob = object_path(f.digest('sha256'))
+        if blob.exists():
+            continue
+
+        # Copy rather than hardlink: dist files can be rewritten in place
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_suffix('.tmp')
+        shutil.copyfile(f.abs_path, tmp)
+        os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        tmp.replace(blob)
+        new_blobs += 1
+
+    created = datetime.now()
+    snapshot_id = created.strftime('%Y%m%d_%H%M%S')
+    existing = {s['id'] for s in index}
+    suffix = 1
+    while snapshot_id in existing:
+        suffix += 1
+        snapshot_id = f"{created.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+
+    snapshot = {
+        'id': snapshot_id,
+        'created': created.isoformat(timespec='seconds'),
+        'files': files,
+    }
+    SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    (SNAPSHOTS_DIR / f'{snapshot_id}.json').write_text(json.dumps(snapshot), encoding='utf-8')
+
+    entry = {
+        'id': snapshot_id,
+        'created': snapshot['created'],
+        'file_count': len(files),
+        'total_size': manifest.total_size,
+        'new_blobs': new_blobs,
+    }
+    index.append(entry)
+    _save_index(index)
+    return entry
+
+
+def restore_snapshot(snapshot_id: str, target_dir: Path) -> Path:
+    """Materialize a snapshot into target_dir, hardlinking blobs where possible"""
+    snapshot = load_snapshot(snapshot_id)
+
+    for path, info in snapshot['files'].items():
+        dest = target_dir / path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        blob = object_path(info['sha256'])
+        try:
+            os.link(blob, dest)
+        except OSError:
+            shutil.copyfile(blob, dest)
+
+    return target_dir
+
+
+def select_retained(index: list[dict], keep_last: int, keep_daily: int) -> set[str]:
+    """IDs kept by policy: the newest keep_last, plus newest per day for keep_daily days"""
+    retained = {s['id'] for s in index[-keep_last:]} if keep_last > 0 else set()
+
+    days_seen = []
+    for s in reversed(index):
+        day = s['created'][:10]
+        if day in days_seen:
+            continue
+        if len(days_seen) >= keep_daily:
+            break
+        days_seen.append(day)
+        retained.add(s['id'])
+
+    return retained
+
+
+def prune_snapshots(keep_last: int = BACKUP_KEEP_LAST, keep_daily: int = BACKUP_KEEP_DAILY) -> tuple[int, int]:
+    """Apply the retention policy and delete blobs no snapshot references
+
+    Returns (snapshots removed, blobs removed).
+    """
+    index = _load_index()
+    retained = select_retained(index, keep_last, keep_daily)
+
+    removed = [s for s in index if s['id'] not in retained]
+    for s in removed:
+        (SNAPSHOTS_DIR / f"{s['id']}.json").unlink(missing_ok=True)
+
+    index = [s for s in index if s['id'] in retained]
+    _save_index(index)
+
+    if not removed:
+        return 0, 0
+
+    referenced = set()
+    for s in index:
+        referenced.update(info['sha256'] for info in load_snapshot(s['id'])['files'].values())
+
+    blobs_removed = 0
+    if OBJECTS_DIR.exists():
+        for bucket in os.scandir(OBJECTS_DIR):
+            for blob in os.scandir(bucket.path):
+                if blob.name not in referenced:
+                    os.chmod(blob.path, stat.S_IWUSR | stat.S_IRUSR)
+                    os.unlink(blob.path)
+                    blobs_removed += 1
+
+    return len(removed), blobs_removed
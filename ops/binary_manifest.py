@@ -0,0 +1,187 @@
+"""
+Binary dist manifest for Oriz
+A compact, memory-mapped alternative to checksums.json for large sites.
+Paths are sorted, so a lookup is a binary search over the mapped file and
+nothing is parsed up front.
+
+Layout (little-endian):
+    header   magic 'ORZM', version u16, digest size u16, count u32,
+             strings size u32
+    offsets  (count + 1) × u32   start of each path in the strings block
+    records  count × (digest, size u64)
+    strings  UTF-8 paths, sorted bytewise, back to back
+"""
+
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR
+
+MAGIC = b'ORZM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+OFFSET = struct.Struct('<I')
+SIZE = struct.Struct('<Q')
+DIGEST_SIZE = 32  # SHA-256
+
+DEFAULT_PATH = CACHE_DIR / 'checksums.bin'
+
+
+def write_binary_manifest(entries: dict[str, tuple[str, int]], out: Path) -> Path:
+    """Write {path: (sha256 hex, size)} to out in the binary format"""
+    paths = sorted(entries, key=lambda p: p.encode('utf-8'))
+    encoded = [p.encode('utf-8') for p in paths]
+
+    offsets = [0]
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, DIGEST_SIZE, len(paths), offsets[-1]))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        for path in paths:
+            sha256, size = entries[path]
+            digest = bytes.fromhex(sha256)
+            if len(digest) != DIGEST_SIZE:
+                raise ValueError(f"{path}: expected a SHA-256 digest, got {sha256!r}")
+            f.write(digest)
+            f.write(SIZE.pack(size))
+        for raw in encoded:
+            f.write(raw)
+    tmp.replace(out)
+    return out
+
+
+class BinaryManifest:
+    """Read-only view of a binary manifest; lookups are O(log n) over an mmap"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a binary manifest")
+
+        file_size = len(self._mm)
+        if file_size < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is truncated ({file_size} bytes)")
+        magic, version, self.digest_size, self.count, strings_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a binary manifest (v{VERSION})")
+
+        self._record_size = self.digest_size + SIZE.size
+        self._offsets = HEADER.size
+        self._records = self._offsets + (self.count + 1) * OFFSET.size
+        self._strings = self._records + self.count * self._record_size
+        expected = self._strings + strings_size
+        if file_size != expected:
+            self.close()
+            raise ValueError(f"{path} is {file_size} bytes, expected {expected} (truncated or corrupt)")
+
+    def _path_bytes(self, i: int) -> bytes:
+        start, end = struct.unpack_from('<II', self._mm, self._offsets + i * OFFSET.size)
+        return self._mm[self._strings + start:self._strings + end]
+
+    def _record(self, i: int) -> tuple[str, int]:
+        at = self._records + i * self._record_size
+        digest = self._mm[at:at + self.digest_size].hex()
+        (size,) = SIZE.unpack_from(self._mm, at + self.digest_size)
+        return digest, size
+
+    def _find(self, path: str) -> int:
+        key = path.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._path_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self._path_bytes(lo) == key else -1
+
+    def get(self, path: str) -> tuple[str, int] | None:
+        """(sha256 hex, size) for a dist path, or None"""
+        i = self._find(path)
+        return self._record(i) if i >= 0 else None
+
+    def __contains__(self, path: str) -> bool:
+        return self._find(path) >= 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        """Yield (path, sha256 hex, size) in path order"""
+        for i in range(self.count):
+            yield (self._path_bytes(i).decode('utf-8'), *self._record(i))
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def json_to_binary(json_path: Path, out: Path, sizes: dict[str, int] | None = None) -> Path:
+    """Convert checksums.json ({path: sha256}) or {path: {'sha256', 'size'}} to binary
+
+    checksums.json has no sizes; pass them in (e.g. from the dist manifest)
+    or they are stored as 0.
+    """
+    data = json.loads(Path(json_path).read_text(encoding='utf-8'))
+    sizes = sizes or {}
+    entries = {}
+    for path, value in data.items():
+        if isinstance(value, dict):
+            entries[path] = (value['sha256'], value.get('size', sizes.get(path, 0)))
+        else:
+            entries[path] = (value, sizes.get(path, 0))
+    return write_binary_manifest(entries, out)
+
+
+def compare_with_dist(manifest: BinaryManifest, dist) -> dict:
+    """Diff a binary manifest against a DistManifest
+
+    Returns {'changed', 'missing', 'added'} path lists. Sizes are compared
+    first, so dist files are only hashed when their size still matches.
+    """
+    changed, added = [], []
+    seen = 0
+    for f in dist:
+        entry = manifest.get(f.path)
+        if entry is None:
+            added.append(f.path)
+            continue
+        seen += 1
+        sha256, size = entry
+        if f.size != size or f.digest('sha256') != sha256:
+            changed.append(f.path)
+
+    missing = []
+    if seen != len(manifest):
+        missing = [path for path, _, _ in manifest if dist.get(path) is None]
+    return {'changed': changed, 'missing': missing, 'added': added}
+
+
+def binary_to_json(bin_path: Path, out: Path, with_sizes: bool = False) -> Path:
+    """Convert a binary manifest back to checksums.json format"""
+    with BinaryManifest(bin_path) as manifest:
+        if with_sizes:
+            data = {path: {'sha256': sha256, 'size': size} for path, sha256, size in manifest}
+        else:
+            data = {path: sha256 for path, sha256, _ in manifest}
+    Path(out).write_text(json.dumps(data, indent=2), encoding='utf-8')
+    return out
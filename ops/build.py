@@ -2,31 +2,27 @@
 Build utilities for Oriz deployment
 """
 
-import subprocess
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from runner import run_command
+from dist_manifest import invalidate_dist_manifest
+
 
 def build_project(project_root: Path) -> bool:
     """Build the project using npm"""
     print("🔨 Building project...")
 
     try:
-        result = subprocess.run(
-            ['npm', 'run', 'build'],
-            cwd=project_root,
-            capture_output=True,
-            text=True,
-            shell=True,
-            encoding='utf-8',
-            errors='replace'
-        )
-
-        if result.returncode != 0:
-            print(f"❌ Build failed:\n{result.stderr}")
+        result = run_command('npm', ['run', 'build'], prefix='build', cwd=project_root)
+        invalidate_dist_manifest()
+
+        if not result.ok:
+            print("❌ Build failed")
             return False
 
-        print("✅ Build completed successfully")
+        print(f"✅ Build completed successfully ({result.duration:.1f}s)")
         return True
 
     except Exception as e:
@@ -57,6 +53,7 @@ def clean_dist(dist_dir: Path) -> bool:
     if dist_dir.exists():
         try:
             shutil.rmtree(dist_dir)
+            invalidate_dist_manifest(dist_dir)
             print("🧹 Cleaned dist directory")
             return True
         except Exception as e:
@@ -0,0 +1,162 @@
+"""
+Bundle size budgets for Oriz
+Records raw, gzip and brotli sizes of every dist file in a local history,
+compares each build with the previous one and checks configured budgets
+"""
+
+import json
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: brotli sizes are reported as unknown
+    brotli = None
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR, DIST_DIR, BUNDLE_BUDGETS, BUNDLE_MAX_GROWTH
+from dist_manifest import get_dist_manifest
+
+HISTORY_FILE = CACHE_DIR / 'bundle_history.jsonl'
+
+# Columns of each per-file entry, and keys of the total and per-extension sums
+SIZE_KEYS = ('size', 'gzip', 'brotli')
+
+
+def _compressed_sizes(path: Path) -> tuple[int, int | None]:
+    """(gzip, brotli) sizes of a file at the levels CDNs serve with"""
+    data = path.read_bytes()
+    gz = len(zlib.compress(data, 9)) + 18  # deflate body + gzip header/trailer
+    br = len(brotli.compress(data, quality=11)) if brotli is not None else None
+    return gz, br
+
+
+def measure_dist(dist_dir: Path = DIST_DIR, workers: int | None = None) -> dict:
+    """Return a size record for dist: totals, per-extension and per-file sizes"""
+    manifest = get_dist_manifest(dist_dir)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        compressed = list(executor.map(
+            lambda f: f.cached('compressed_sizes', _compressed_sizes), manifest
+        ))
+
+    # Without the brotli module every brotli total stays None
+    empty = {'size': 0, 'gzip': 0, 'brotli': 0 if brotli is not None else None}
+    files = {}
+    by_ext: dict[str, dict] = {}
+    total = dict(empty)
+
+    for f, (gz, br) in zip(manifest, compressed):
+        files[f.path] = [f.size, gz, br]
+        ext = by_ext.setdefault(f.ext, dict(empty))
+        for sums in (ext, total):
+            sums['size'] += f.size
+            sums['gzip'] += gz
+            if br is not None:
+                sums['brotli'] += br
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'fingerprint': manifest.fingerprint(),
+        'file_count': len(files),
+        'total': total,
+        'by_ext': by_ext,
+        'files': files,
+    }
+
+
+def load_history() -> list[dict]:
+    """All recorded builds, oldest first"""
+    try:
+        with open(HISTORY_FILE, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def record_build(record: dict) -> dict | None:
+    """Append a record to the history; returns the previous build's record
+
+    Re-measuring the same dist (same fingerprint) does not add a new entry.
+    """
+    history = load_history()
+    previous = history[-1] if history else None
+
+    if previous and previous['fingerprint'] == record['fingerprint']:
+        return history[-2] if len(history) > 1 else None
+
+    HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+    return previous
+
+
+def compare_builds(previous: dict, current: dict, top: int = 10) -> dict:
+    """Size deltas between two records plus the files that grew the most"""
+    delta = {
+        key: (current['total'][key] - previous['total'][key])
+        if current['total'][key] is not None and previous['total'][key] is not None else None
+        for key in SIZE_KEYS
+    }
+
+    changes = []
+    for path in current['files'].keys() | previous['files'].keys():
+        before = previous['files'].get(path, [0, 0, 0])
+        after = current['files'].get(path, [0, 0, 0])
+        if before[:2] != after[:2]:
+            changes.append({
+                'path': path,
+                'size': after[0] - before[0],
+                'gzip': after[1] - before[1],
+                'status': 'added' if path not in previous['files']
+                          else 'deleted' if path not in current['files'] else 'modified',
+            })
+
+    changes.sort(key=lambda c: -c['gzip'])
+    return {
+        'delta': delta,
+        'growth': [c for c in changes if c['gzip'] > 0][:top],
+        'shrink': [c for c in reversed(changes) if c['gzip'] < 0][:top],
+    }
+
+
+def check_budgets(record: dict, previous: dict | None = None,
+                  budgets: dict = BUNDLE_BUDGETS, max_growth: float | None = BUNDLE_MAX_GROWTH) -> list[str]:
+    """Return a message for every budget the record exceeds (gzip bytes)
+
+    Budget keys are 'total', an extension like '.js', or a dist path.
+    """
+    violations = []
+    for key, limit in budgets.items():
+        if key == 'total':
+            actual = record['total']['gzip']
+        elif key.startswith('.'):
+            actual = record['by_ext'].get(key, {}).get('gzip', 0)
+        else:
+            actual = (record['files'].get(key) or [0, 0])[1]
+
+        if actual > limit:
+            violations.append(f"{key}: {actual:,} B gzip exceeds budget of {limit:,} B")
+
+    if max_growth is not None and previous and previous['total']['gzip']:
+        growth = record['total']['gzip'] / previous['total']['gzip'] - 1
+        if growth > max_growth:
+            violations.append(f"total gzip grew {growth:.1%} since the last build "
+                              f"(limit {max_growth:.0%})")
+
+    return violations
+
+
+def check_bundle(dist_dir: Path = DIST_DIR) -> dict:
+    """Measure dist, add it to the history and check it against the budgets"""
+    record = measure_dist(dist_dir)
+    previous = record_build(record)
+    return {
+        'record': record,
+        'previous': previous,
+        'comparison': compare_builds(previous, record) if previous else None,
+        'violations': check_budgets(record, previous),
+    }
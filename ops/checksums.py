@@ -0,0 +1,149 @@
+"""
+Checksum engine for Oriz
+Computes several digests per file in one read pass, memory-mapping large
+files and hashing files in parallel (hashlib releases the GIL)
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR
+
+# Digests the platforms need: SHA-256 for checksums.json, SHA-1 for
+# Netlify/Vercel/Neocities, MD5 for ETag comparisons
+DIGESTS = ('sha256', 'sha1', 'md5')
+
+# Files at least this big are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path, algorithms: tuple[str, ...] = DIGESTS) -> dict[str, str]:
+    """Return {algorithm: hexdigest} for a file, reading it only once"""
+    hashers = [hashlib.new(name) for name in algorithms]
+
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2)
+        f.seek(0)
+
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for offset in range(0, size, CHUNK_SIZE):
+                        chunk = view[offset:offset + CHUNK_SIZE]
+                        for h in hashers:
+                            h.update(chunk)
+                        chunk.release()
+                finally:
+                    view.release()
+        else:
+            data = f.read()
+            for h in hashers:
+                h.update(data)
+
+    return {name: h.hexdigest() for name, h in zip(algorithms, hashers)}
+
+
+def hash_files(
+    paths: list[Path],
+    algorithms: tuple[str, ...] = DIGESTS,
+    workers: int | None = None,
+) -> list[dict[str, str]]:
+    """Hash many files on a thread pool; results are in the order given"""
+    if len(paths) <= 1:
+        return [hash_file(p, algorithms) for p in paths]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda p: hash_file(p, algorithms), paths))
+
+
+class ChecksumCache:
+    """Persistent digests keyed by path, size, mtime_ns and inode
+
+    A row is only trusted while all four still match the file on disk;
+    anything else is a miss and gets overwritten when the file is rehashed.
+    """
+
+    def __init__(self, db_path: Path = CACHE_DIR / 'checksums.sqlite'):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            f"""CREATE TABLE IF NOT EXISTS digests (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                {', '.join(f'{name} TEXT NOT NULL' for name in DIGESTS)}
+            )"""
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, path: Path, size: int, mtime_ns: int, inode: int) -> dict[str, str] | None:
+        """Return cached digests if the file is unchanged, else None"""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(DIGESTS)} FROM digests "
+                "WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (str(path), size, mtime_ns, inode),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(zip(DIGESTS, row))
+
+    def store(self, entries: list[tuple[Path, int, int, int, dict[str, str]]]):
+        """Save (path, size, mtime_ns, inode, digests) rows in one transaction"""
+        with self._lock, self._db:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, {', '.join('?' for _ in DIGESTS)})",
+                [
+                    (str(path), size, mtime_ns, inode, *(digests[name] for name in DIGESTS))
+                    for path, size, mtime_ns, inode, digests in entries
+                ],
+            )
+
+    def prune(self, root: Path, keep: set[str]):
+        """Evict rows under root whose files no longer exist"""
+        prefix = str(root).rstrip('/\\') + os.sep
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT path FROM digests WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+            stale = [(path,) for (path,) in rows if path not in keep]
+            self._db.executemany("DELETE FROM digests WHERE path = ?", stale)
+        return len(stale)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+_cache: ChecksumCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_checksum_cache() -> ChecksumCache:
+    """Return the process-wide checksum cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChecksumCache()
+        return _cache
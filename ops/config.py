@@ -14,9 +14,29 @@ load_dotenv(env_path)
 # Build configuration
 PROJECT_ROOT = Path(__file__).parent.parent
 DIST_DIR = PROJECT_ROOT / 'dist'
+CACHE_DIR = PROJECT_ROOT / '.cache'
 BUILD_COMMAND = 'npm run build'
 DOMAIN = 'oriz.in'
 
+# Backup retention: always keep the newest N snapshots, plus the newest
+# snapshot of each of the last N days
+BACKUP_KEEP_LAST = int(os.getenv('BACKUP_KEEP_LAST', '10'))
+BACKUP_KEEP_DAILY = int(os.getenv('BACKUP_KEEP_DAILY', '7'))
+
+# Bundle size budgets in gzip bytes, keyed by 'total', an extension or a
+# dist path. BUNDLE_BUDGET_MODE 'fail' stops run_all before deploying;
+# 'warn' only reports. BUNDLE_MAX_GROWTH caps total growth per build.
+BUNDLE_BUDGETS = {
+    'total': int(os.getenv('BUNDLE_BUDGET_TOTAL', str(500 * 1024))),
+    '.js': int(os.getenv('BUNDLE_BUDGET_JS', str(200 * 1024))),
+    '.css': int(os.getenv('BUNDLE_BUDGET_CSS', str(50 * 1024))),
+}
+BUNDLE_BUDGET_MODE = os.getenv('BUNDLE_BUDGET_MODE', 'warn').lower()
+BUNDLE_MAX_GROWTH = float(os.getenv('BUNDLE_MAX_GROWTH', '0.10'))
+
+# Concurrency for file uploads in API-based deployers
+DEPLOY_WORKERS = int(os.getenv('DEPLOY_WORKERS', '8'))
+
 # Cloudflare Configuration
 CLOUDFLARE = {
     'enabled': os.getenv('ENABLE_CLOUDFLARE', 'False').lower() == 'true',
@@ -40,6 +60,7 @@ VERCEL = {
     'token': os.getenv('VERCEL_TOKEN'),
     'org_id': os.getenv('VERCEL_ORG_ID'),
     'project_id': os.getenv('VERCEL_PROJECT_ID'),
+    'project_name': os.getenv('VERCEL_PROJECT_NAME', 'oriz'),
 }
 
 # Surge Configuration
@@ -77,6 +98,43 @@ EMAIL = {
 }
 
 
+# SMTP for outgoing reports (queued in .cache/outbox.sqlite and sent in
+# the background). SMTP_SECURITY is 'starttls', 'ssl' or 'none'.
+SMTP = {
+    'host': os.getenv('SMTP_HOST'),
+    'port': int(os.getenv('SMTP_PORT', '587')),
+    'username': os.getenv('SMTP_USERNAME'),
+    'password': os.getenv('SMTP_PASSWORD'),
+    'security': os.getenv('SMTP_SECURITY', 'starttls').lower(),
+    'from': os.getenv('SMTP_FROM', f'Oriz Deploy <deploy@{DOMAIN}>'),
+}
+
+
+# Deploy reports within this many seconds of the last one are held and
+# sent together as a digest (0 sends every report)
+NOTIFY_DIGEST_WINDOW = int(os.getenv('NOTIFY_DIGEST_WINDOW', '900'))
+
+# Email Routing rules and destinations are cached in .cache for this many
+# seconds, shared by --setup and the listing commands (0 always refetches)
+EMAIL_ROUTING_CACHE_TTL = int(os.getenv('EMAIL_ROUTING_CACHE_TTL', '300'))
+
+# Forwarding rules stay disabled until their destination address is
+# verified. --setup waits up to this many seconds for verification before
+# leaving them held for the next run (0 doesn't wait).
+EMAIL_VERIFY_TIMEOUT = int(os.getenv('EMAIL_VERIFY_TIMEOUT', '0'))
+
+# Mirrors probed by final_check: label → URL and per-request timeout (s).
+# Each is sampled PROBE_SAMPLES times over one kept-alive connection.
+MIRRORS = {
+    'Main Site (Cloudflare)': {'url': os.getenv('MIRROR_CLOUDFLARE_URL', f'https://about.{DOMAIN}'), 'timeout': 10},
+    'Netlify': {'url': os.getenv('MIRROR_NETLIFY_URL', 'https://chirag127.netlify.app'), 'timeout': 10},
+    'Vercel': {'url': os.getenv('MIRROR_VERCEL_URL', 'https://chirag127-6r7f25peu-whyiswhengmailcoms-projects.vercel.app'), 'timeout': 10},
+    'Surge': {'url': os.getenv('MIRROR_SURGE_URL', 'https://chirag127.surge.sh'), 'timeout': 10},
+    'Neocities': {'url': os.getenv('MIRROR_NEOCITIES_URL', 'https://chirag127.neocities.org'), 'timeout': 10},
+}
+PROBE_SAMPLES = int(os.getenv('PROBE_SAMPLES', '5'))
+
+
 def get_enabled_platforms():
     """Return list of enabled deployment platforms"""
     platforms = []
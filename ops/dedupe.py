@@ -0,0 +1,118 @@
+"""
+Duplicate asset report for Oriz
+Finds files shipped more than once under different names in dist, and how
+much of dist was already present in the previous backup snapshot. Files
+are grouped by size first so only size collisions ever get hashed.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import DIST_DIR
+from backup_store import list_snapshots, load_snapshot
+from dist_manifest import DistManifest, get_dist_manifest
+
+
+def _by_size(files) -> dict[int, list]:
+    groups: dict[int, list] = {}
+    for f in files:
+        groups.setdefault(f.size, []).append(f)
+    return groups
+
+
+def find_duplicates(manifest: DistManifest) -> list[dict]:
+    """Groups of identical files in dist, most wasted bytes first
+
+    Each group is {'sha256', 'size', 'paths', 'wasted'}, where wasted is
+    the bytes that would be saved by shipping the content once.
+    """
+    # Empty files are all "identical" but cost nothing
+    candidates = [group for size, group in _by_size(manifest).items() if size and len(group) > 1]
+
+    groups = []
+    for same_size in candidates:
+        by_hash: dict[str, list[str]] = {}
+        for f in same_size:
+            by_hash.setdefault(f.digest('sha256'), []).append(f.path)
+
+        for sha256, paths in by_hash.items():
+            if len(paths) > 1:
+                size = same_size[0].size
+                groups.append({
+                    'sha256': sha256,
+                    'size': size,
+                    'paths': sorted(paths),
+                    'wasted': size * (len(paths) - 1),
+                })
+
+    groups.sort(key=lambda g: -g['wasted'])
+    return groups
+
+
+def previous_snapshot(manifest: DistManifest) -> dict | None:
+    """Newest backup snapshot whose contents differ from dist
+
+    Paths and sizes settle most comparisons; dist is only hashed when a
+    snapshot matches it on both.
+    """
+    current_sizes = {f.path: f.size for f in manifest}
+
+    for s in reversed(list_snapshots()):
+        snapshot = load_snapshot(s['id'])
+        if {path: info['size'] for path, info in snapshot['files'].items()} != current_sizes:
+            return snapshot
+
+        manifest.hash_all()
+        if any(manifest.get(path).digest('sha256') != info['sha256']
+               for path, info in snapshot['files'].items()):
+            return snapshot
+
+    return None
+
+
+def cross_build_reuse(manifest: DistManifest, snapshot: dict) -> dict:
+    """How much of dist is content the previous build already shipped
+
+    'renamed' counts reused content under a new path, e.g. a Vite chunk
+    whose hashed filename changed while its bytes did not.
+    """
+    previous_paths: dict[str, set[str]] = {}
+    previous_sizes = set()
+    for path, info in snapshot['files'].items():
+        previous_paths.setdefault(info['sha256'], set()).add(path)
+        previous_sizes.add(info['size'])
+
+    reused_files = reused_bytes = 0
+    renamed = []
+    for f in manifest:
+        # A size the previous build never had can't be reused content
+        if f.size not in previous_sizes:
+            continue
+        paths = previous_paths.get(f.digest('sha256'))
+        if paths is None:
+            continue
+        reused_files += 1
+        reused_bytes += f.size
+        if f.path not in paths:
+            renamed.append((min(paths), f.path, f.size))
+
+    total = manifest.total_size
+    return {
+        'snapshot': snapshot['id'],
+        'reused_files': reused_files,
+        'reused_bytes': reused_bytes,
+        'new_bytes': total - reused_bytes,
+        'reuse_ratio': reused_bytes / total if total else 1.0,
+        'renamed': sorted(renamed, key=lambda r: -r[2]),
+    }
+
+
+def dedupe_report(dist_dir: Path = DIST_DIR) -> dict:
+    """Duplicate groups inside dist plus reuse against the previous snapshot"""
+    manifest = get_dist_manifest(dist_dir)
+    snapshot = previous_snapshot(manifest)
+    return {
+        'duplicates': find_duplicates(manifest),
+        'reuse': cross_build_reuse(manifest, snapshot) if snapshot else None,
+    }
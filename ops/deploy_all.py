@@ -3,25 +3,32 @@ Deploy Oriz to ALL enabled platforms
 """
 
 import sys
+import time
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 from config import get_enabled_platforms, PROJECT_ROOT, DIST_DIR
 from build import build_project, ensure_dist_exists
+from deploy_state import deploy_if_changed, load_state
+from deploy_metrics import begin, end, record_build, build_report, save_report, format_platform
 
 
-def deploy_all():
-    """Deploy to all enabled platforms"""
+def deploy_all(force: bool = False):
+    """Deploy to all enabled platforms, skipping those already up to date"""
     print("=" * 60)
     print("🚀 Oriz Multi-Platform Deployment")
     print("=" * 60)
 
     # Build once for all platforms
     print("\n📦 Building project...")
-    if not ensure_dist_exists(DIST_DIR):
+    if ensure_dist_exists(DIST_DIR):
+        record_build(None)
+    else:
+        started = time.perf_counter()
         if not build_project(PROJECT_ROOT):
             print("❌ Build failed. Aborting deployment.")
             return False
+        record_build(time.perf_counter() - started)
 
     platforms = get_enabled_platforms()
 
@@ -33,32 +40,53 @@ def deploy_all():
     print(f"\n📋 Enabled platforms: {', '.join(platforms)}")
 
     results = {}
+    statuses = {}
+    durations = {}
 
     # Deploy to each platform
     if 'cloudflare' in platforms:
-        from deploy_cf import deploy_to_cloudflare
-        results['Cloudflare'] = deploy_to_cloudflare()
+        from deploy_cf import deploy_to_cloudflare, fetch_deployed_hash
+        begin('cloudflare')
+        statuses['Cloudflare'] = deploy_if_changed('cloudflare', deploy_to_cloudflare, fetch_deployed_hash, force)
+        durations['Cloudflare'] = end('cloudflare', statuses['Cloudflare'])
 
     if 'netlify' in platforms:
-        from deploy_netlify import deploy_to_netlify
-        results['Netlify'] = deploy_to_netlify()
+        from deploy_netlify import deploy_to_netlify, fetch_deployed_hash
+        begin('netlify')
+        statuses['Netlify'] = deploy_if_changed('netlify', deploy_to_netlify, fetch_deployed_hash, force)
+        durations['Netlify'] = end('netlify', statuses['Netlify'])
 
     if 'vercel' in platforms:
-        from deploy_vercel import deploy_to_vercel
-        results['Vercel'] = deploy_to_vercel()
+        from deploy_vercel import deploy_to_vercel, fetch_deployed_hash
+        begin('vercel')
+        statuses['Vercel'] = deploy_if_changed('vercel', deploy_to_vercel, fetch_deployed_hash, force)
+        durations['Vercel'] = end('vercel', statuses['Vercel'])
 
     if 'surge' in platforms:
         from deploy_surge import deploy_to_surge
-        results['Surge'] = deploy_to_surge()
+        begin('surge')
+        statuses['Surge'] = deploy_if_changed('surge', deploy_to_surge, force=force)
+        durations['Surge'] = end('surge', statuses['Surge'])
 
     if 'neocities' in platforms:
         from deploy_neocities import deploy_to_neocities
-        results['Neocities'] = deploy_to_neocities()
+        begin('neocities')
+        statuses['Neocities'] = deploy_if_changed('neocities', deploy_to_neocities, force=force)
+        durations['Neocities'] = end('neocities', statuses['Neocities'])
+
+    for platform, status in statuses.items():
+        results[platform] = status != 'failed'
+
+    report = build_report(statuses)
+    try:
+        save_report(report)
+    except OSError as e:
+        print(f"⚠️ Could not save deploy report: {e}")
 
     # Send email notification with results
     try:
         from manage_email import send_deployment_report
-        send_deployment_report(results)
+        send_deployment_report(results, durations, perf=report)
     except Exception as e:
         print(f"⚠️ Email notification skipped: {e}")
 
@@ -67,18 +95,41 @@ def deploy_all():
     print("📊 Deployment Summary")
     print("=" * 60)
 
-    for platform, success in results.items():
-        status = "✅ Success" if success else "❌ Failed"
-        print(f"   {platform}: {status}")
+    state = load_state()
+    for platform, status in statuses.items():
+        if status == 'skipped':
+            skips = state.get(platform.lower(), {}).get('skips', 0)
+            print(f"   {platform}: ⏭️ Skipped, up to date ({skips} skips since last deploy)")
+        else:
+            print(f"   {platform}: {'✅ Success' if status == 'deployed' else '❌ Failed'}")
+        print(f"      {format_platform(report['platforms'][platform])}")
 
     success_count = sum(1 for s in results.values() if s)
+    skipped_count = sum(1 for s in statuses.values() if s == 'skipped')
     total = len(results)
 
-    print(f"\n   Total: {success_count}/{total} platforms succeeded")
+    print(f"\n   Total: {success_count}/{total} platforms succeeded ({skipped_count} skipped)")
 
     return success_count == total
 
 
 if __name__ == '__main__':
-    success = deploy_all()
+    try:
+        if '--plan' in sys.argv[1:]:
+            from deploy_plan import plan_all
+            plans = plan_all(verbose='--verbose' in sys.argv[1:])
+            success = all(plans.values())
+        else:
+            success = deploy_all(force='--force' in sys.argv[1:])
+    except KeyboardInterrupt:
+        from runner import cancel_all
+        cancel_all()
+        print("\n⛔ Deployment cancelled")
+        success = False
+
+    # The report is sent in the background; give it a moment before exiting.
+    # Anything unsent stays in the outbox for the next run.
+    from mail_outbox import wait_for_outbox
+    if not wait_for_outbox(timeout=30):
+        print("   ⏳ Report still sending — run python ops/mail_outbox.py --drain later")
     sys.exit(0 if success else 1)
@@ -2,19 +2,47 @@
 Deploy Oriz to Cloudflare Pages
 """
 
-import requests
-import subprocess
+import base64
+import hashlib
+import json
+import mimetypes
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+try:
+    from blake3 import blake3
+except ImportError:  # optional: hashes then won't match Wrangler's asset keys
+    blake3 = None
+
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 from config import CLOUDFLARE, PROJECT_ROOT, DIST_DIR
 from build import build_project, ensure_dist_exists
+from runner import run_command
+from dist_manifest import get_dist_manifest
+from deploy_metrics import MeteredSession, record, count_retry
+from deploy_plan import diff_manifests
+from deploy_state import REMOTE_PREFIX, dist_content_hash, parse_remote_hash
+
+_session = MeteredSession('cloudflare')
+
+API_URL = "https://api.cloudflare.com/client/v4"
+
+# Limits used by Wrangler for direct uploads
+MAX_BUCKET_SIZE = 40 * 1024 * 1024
+MAX_BUCKET_FILES = 2000
+UPLOAD_CONCURRENCY = 3
+
+# Files Pages reads as configuration (or, for _worker.js, runs as the
+# advanced-mode Functions worker) rather than serving as assets. They are
+# attached to the deployment form instead of uploaded.
+CONFIG_FILES = ('_headers', '_redirects', '_routes.json', '_worker.js')
 
 
 def deploy_to_cloudflare():
-    """Deploy to Cloudflare Pages using Wrangler CLI"""
+    """Deploy to Cloudflare Pages using direct upload"""
     print("\n🚀 Deploying to Cloudflare Pages...")
 
     if not CLOUDFLARE['enabled']:
@@ -31,27 +59,293 @@ def deploy_to_cloudflare():
         if not build_project(PROJECT_ROOT):
             return False
 
+    # Ensure project exists
+    if not ensure_cloudflare_project():
+        return False
+
+    return deploy_dir(DIST_DIR)
+
+
+def deploy_dir(dist_dir: Path) -> bool:
+    """Deploy a directory via direct upload"""
+    return deploy_via_api(dist_dir)
+
+
+def deploy_via_api(dist_dir: Path = DIST_DIR):
+    """Deploy via the Pages direct-upload API, uploading only missing assets"""
+    print("📤 Deploying via Cloudflare Pages API...")
+
     project_name = CLOUDFLARE.get('project_name', 'oriz')
 
-    # Ensure project exists
-    create_cloudflare_project()
+    if (dist_dir / '_worker.js').is_dir():
+        # A _worker.js directory has to be bundled first, which Wrangler does
+        print("❌ dist/_worker.js/ is a directory; deploy with --wrangler so it gets bundled")
+        return False
+
+    assets = _collect_assets(dist_dir)
+
+    # Step 1: Get a short-lived upload token for the asset endpoints
+    jwt = _get_upload_token(project_name)
+    if not jwt:
+        return False
+
+    # Step 2: Ask which hashes Cloudflare doesn't have yet
+    hashes = sorted({h for h, _ in assets.values()})
+    missing = _check_missing(jwt, hashes)
+    if missing is None:
+        return False
+
+    missing_set = set(missing)
+    record('cloudflare', files_changed=sum(1 for h, _ in assets.values() if h in missing_set))
+    print(f"   📋 {len(assets)} files, {len(missing)} to upload")
+
+    # Step 3: Upload missing assets concurrently in size-capped buckets
+    if missing:
+        by_hash = {h: file_path for h, file_path in assets.values()}
+        buckets = _make_buckets([(h, by_hash[h]) for h in missing])
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(_upload_bucket, jwt, bucket): i
+                for i, bucket in enumerate(buckets, 1)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                bucket = buckets[i - 1]
+                if future.result():
+                    record('cloudflare', files_uploaded=len(bucket),
+                           bytes_uploaded=sum(file_path.stat().st_size for _, file_path in bucket))
+                    print(f"   ✓ Uploaded bucket {i}/{len(buckets)} ({len(bucket)} files)")
+                else:
+                    print(f"   ❌ Bucket {i}/{len(buckets)} failed")
+                    failed += 1
+
+        if failed:
+            print(f"❌ {failed} buckets failed to upload")
+            return False
+
+    # Step 4: Mark every hash as recently used so Cloudflare keeps them
+    if not _upsert_hashes(jwt, hashes):
+        return False
+
+    # Step 5: Create the deployment from the manifest
+    manifest = {path: h for path, (h, _) in assets.items()}
+    deployment = _create_deployment(project_name, manifest, dist_dir)
+    if not deployment:
+        return False
+
+    print("✅ Deployed to Cloudflare Pages!")
+    print(f"   🌐 https://{project_name}.pages.dev")
+    if deployment.get('url'):
+        print(f"   📍 {deployment['url']}")
+    return True
+
+
+def plan_deploy(dist_dir: Path = DIST_DIR) -> dict:
+    """Ask Pages which assets it lacks (no uploads)
+
+    Pages exposes no per-deployment manifest, so changed files show up as
+    additions and deletions can't be reported.
+    """
+    project_name = CLOUDFLARE.get('project_name', 'oriz')
+    manifest = get_dist_manifest(dist_dir)
+    local = {
+        f"/{f.path}": (f.cached('pages', _hash_asset), f.size)
+        for f in manifest
+        if f.path not in CONFIG_FILES
+    }
+
+    jwt = _get_upload_token(project_name)
+    missing = _check_missing(jwt, sorted({h for h, _ in local.values()})) if jwt else None
+
+    plan = diff_manifests(local, None)
+    if missing is not None:
+        missing = set(missing)
+        sizes = {h: size for h, size in local.values() if h in missing}
+        plan.update({
+            'added': sorted(p for p, (h, _) in local.items() if h in missing),
+            'upload_files': len(sizes),
+            'upload_bytes': sum(sizes.values()),
+            'known': True,
+        })
+    plan['note'] = "Pages has no remote manifest; changes shown as uploads, deletions not reported"
+    return plan
+
+
+def fetch_deployed_hash() -> str | None:
+    """Return the dist hash stored on the production deployment, if any"""
+    project_name = CLOUDFLARE.get('project_name', 'oriz')
+    url = f"{API_URL}/accounts/{CLOUDFLARE['account_id']}/pages/projects/{project_name}"
+
+    response = _session.get(url, headers=get_headers(), timeout=30)
+    project = response.json().get('result') or {}
+    deployment = project.get('canonical_deployment') or {}
+    metadata = (deployment.get('deployment_trigger') or {}).get('metadata') or {}
+    return parse_remote_hash(metadata.get('commit_message'))
+
+
+def _hash_asset(file_path: Path) -> str:
+    """Hash a file the way Wrangler does: base64 contents + extension, 32 hex chars"""
+    data = base64.b64encode(file_path.read_bytes()) + file_path.suffix[1:].encode()
+    if blake3 is not None:
+        return blake3(data).hexdigest()[:32]
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _collect_assets(dist_dir: Path) -> dict:
+    """Map '/relative/path' → (hash, file path) for every servable file in dist"""
+    return {
+        f"/{f.path}": (f.cached('pages', _hash_asset), f.abs_path)
+        for f in get_dist_manifest(dist_dir)
+        if f.path not in CONFIG_FILES
+    }
+
+
+def _make_buckets(files: list) -> list:
+    """Group (hash, file path) pairs into buckets under the upload limits"""
+    buckets = []
+    current, current_size = [], 0
+
+    for h, file_path in sorted(files, key=lambda f: -f[1].stat().st_size):
+        size = file_path.stat().st_size
+        if current and (current_size + size > MAX_BUCKET_SIZE or len(current) >= MAX_BUCKET_FILES):
+            buckets.append(current)
+            current, current_size = [], 0
+        current.append((h, file_path))
+        current_size += size
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def _get_upload_token(project_name: str) -> str | None:
+    """Get the JWT used to authenticate asset uploads"""
+    url = f"{API_URL}/accounts/{CLOUDFLARE['account_id']}/pages/projects/{project_name}/upload-token"
+
+    try:
+        response = _session.get(url, headers=get_headers(), timeout=30)
+        result = response.json()
+        if result.get('success'):
+            return result['result']['jwt']
+        print(f"❌ Could not get upload token: {result.get('errors', [])}")
+        return None
+    except Exception as e:
+        print(f"❌ API error: {e}")
+        return None
+
+
+def _post_assets(jwt: str, endpoint: str, payload) -> dict:
+    """POST to a /pages/assets endpoint with the upload token"""
+    response = _session.post(
+        f"{API_URL}/pages/assets/{endpoint}",
+        headers={'Authorization': f"Bearer {jwt}", 'Content-Type': 'application/json'},
+        json=payload,
+        timeout=300,
+    )
+    return response.json()
+
+
+def _check_missing(jwt: str, hashes: list) -> list | None:
+    """Return the hashes Cloudflare doesn't already store"""
+    try:
+        result = _post_assets(jwt, 'check-missing', {'hashes': hashes})
+        if result.get('success'):
+            return result['result']
+        print(f"❌ Could not check assets: {result.get('errors', [])}")
+        return None
+    except Exception as e:
+        print(f"❌ API error: {e}")
+        return None
+
+
+def _upsert_hashes(jwt: str, hashes: list) -> bool:
+    """Refresh the hashes so Cloudflare doesn't expire them before the deploy"""
+    try:
+        result = _post_assets(jwt, 'upsert-hashes', {'hashes': hashes})
+        if result.get('success'):
+            return True
+        print(f"❌ Could not upsert asset hashes: {result.get('errors', [])}")
+        return False
+    except Exception as e:
+        print(f"❌ API error: {e}")
+        return False
+
+
+def _upload_bucket(jwt: str, bucket: list, attempts: int = 3) -> bool:
+    """Upload one bucket of assets, retrying transient failures"""
+    payload = []
+    for h, file_path in bucket:
+        content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+        payload.append({
+            'key': h,
+            'value': base64.b64encode(file_path.read_bytes()).decode('ascii'),
+            'metadata': {'contentType': content_type},
+            'base64': True,
+        })
+
+    for attempt in range(attempts):
+        if attempt:
+            count_retry('cloudflare')
+        try:
+            if _post_assets(jwt, 'upload', payload).get('success'):
+                return True
+        except Exception:
+            pass
+        if attempt < attempts - 1:
+            time.sleep(2 ** attempt)
+
+    return False
+
+
+def _create_deployment(project_name: str, manifest: dict, dist_dir: Path) -> dict | None:
+    """Create a deployment from the asset manifest and config files"""
+    url = f"{API_URL}/accounts/{CLOUDFLARE['account_id']}/pages/projects/{project_name}/deployments"
+
+    # Multipart upload, so drop the JSON content type
+    headers = {k: v for k, v in get_headers().items() if k != 'Content-Type'}
+
+    form = {
+        'manifest': (None, json.dumps(manifest)),
+        'branch': (None, 'main'),
+        'commit_message': (None, f"{REMOTE_PREFIX}{dist_content_hash(dist_dir)}"),
+    }
+    for name in CONFIG_FILES:
+        config_file = dist_dir / name
+        if config_file.is_file():
+            content_type = 'application/javascript' if name.endswith('.js') else None
+            form[name] = (name, config_file.read_bytes(), content_type)
+
+    try:
+        response = _session.post(url, headers=headers, files=form, timeout=120)
+        result = response.json()
+        if result.get('success'):
+            return result['result']
+        print(f"❌ Deployment failed: {result.get('errors', [])}")
+        return None
+    except Exception as e:
+        print(f"❌ Deployment error: {e}")
+        return None
+
+
+def deploy_via_wrangler():
+    """Deploy to Cloudflare Pages using Wrangler CLI"""
+    print("📤 Deploying via Wrangler CLI...")
+
+    project_name = CLOUDFLARE.get('project_name', 'oriz')
 
     try:
         # Use wrangler pages deploy
-        result = subprocess.run(
+        result = run_command(
+            'wrangler',
             [
-                'npx', 'wrangler', 'pages', 'deploy', 'dist',
+                'pages', 'deploy', 'dist',
                 '--project-name', project_name,
                 '--commit-dirty=true'
             ],
-            cwd=PROJECT_ROOT,
-            capture_output=True,
-            text=True,
-            shell=True,
-            encoding='utf-8',
-            errors='replace',
+            prefix='cloudflare',
             env={
-                **dict(__import__('os').environ),
                 'CLOUDFLARE_ACCOUNT_ID': CLOUDFLARE['account_id'],
                 # Global API Key auth requires both API_KEY and EMAIL
                 'CLOUDFLARE_API_KEY': CLOUDFLARE['api_key'],
@@ -59,15 +353,15 @@ def deploy_to_cloudflare():
             }
         )
 
-        if result.returncode != 0:
-            print(f"❌ Deployment failed:\n{result.stderr}")
+        if not result.ok:
+            print("❌ Deployment failed")
             return False
 
         print(f"✅ Deployed to Cloudflare Pages!")
         print(f"   🌐 https://{project_name}.pages.dev")
 
         # Extract deployment URL from output
-        for line in result.stdout.split('\n'):
+        for line in result.output.split('\n'):
             if 'https://' in line and '.pages.dev' in line:
                 print(f"   📍 {line.strip()}")
 
@@ -81,17 +375,28 @@ def deploy_to_cloudflare():
         return False
 
 
+def ensure_cloudflare_project():
+    """Create the Pages project only if it doesn't exist yet"""
+    project_name = CLOUDFLARE.get('project_name', 'oriz')
+    url = f"{API_URL}/accounts/{CLOUDFLARE['account_id']}/pages/projects/{project_name}"
+
+    try:
+        response = _session.get(url, headers=get_headers(), timeout=30)
+        if response.status_code == 200 and response.json().get('success'):
+            return True
+    except Exception as e:
+        print(f"⚠️ Could not look up project: {e}")
+
+    return create_cloudflare_project()
+
+
 def create_cloudflare_project():
     """Create a new Cloudflare Pages project via API"""
     print("📁 Creating Cloudflare Pages project...")
 
-    url = f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE['account_id']}/pages/projects"
+    url = f"{API_URL}/accounts/{CLOUDFLARE['account_id']}/pages/projects"
 
-    headers = {
-        'X-Auth-Email': CLOUDFLARE['email'],
-        'X-Auth-Key': CLOUDFLARE['api_key'],
-        'Content-Type': 'application/json'
-    }
+    headers = get_headers()
 
     data = {
         'name': CLOUDFLARE.get('project_name', 'oriz'),
@@ -99,7 +404,7 @@ def create_cloudflare_project():
     }
 
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = _session.post(url, headers=headers, json=data, timeout=30)
         result = response.json()
 
         if result.get('success'):
@@ -118,10 +423,22 @@ def create_cloudflare_project():
         return False
 
 
+def get_headers() -> dict:
+    """Get Cloudflare API headers"""
+    return {
+        'X-Auth-Email': CLOUDFLARE['email'],
+        'X-Auth-Key': CLOUDFLARE['api_key'],
+        'Content-Type': 'application/json'
+    }
+
+
 if __name__ == '__main__':
     print("=" * 50)
     print("📦 Oriz → Cloudflare Pages Deployment")
     print("=" * 50)
 
-    success = deploy_to_cloudflare()
+    if '--wrangler' in sys.argv[1:]:
+        success = ensure_cloudflare_project() and deploy_via_wrangler()
+    else:
+        success = deploy_to_cloudflare()
     sys.exit(0 if success else 1)
@@ -0,0 +1,181 @@
+"""
+Deploy performance metrics for Oriz
+Counts API calls, bytes and retries per platform during a deploy run and
+assembles them, with build time and dist size, into a JSON report that is
+kept in .cache/perf_history.jsonl for spotting slow platforms over time.
+"""
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR, DIST_DIR, PROJECT_ROOT
+
+HISTORY_FILE = CACHE_DIR / 'perf_history.jsonl'
+REPORT_FILE = PROJECT_ROOT / 'deploy_report.json'
+
+COUNTERS = (
+    'files_uploaded', 'bytes_uploaded', 'files_changed', 'retries',
+    'api_calls', 'api_errors', 'api_bytes_sent', 'api_bytes_received',
+)
+
+_lock = threading.Lock()
+_platforms: dict[str, dict] = {}   # platform → metrics for this run
+_build_seconds: float | None = None
+
+
+class MeteredSession(requests.Session):
+    """A requests.Session that counts one platform's API calls, errors and bytes
+
+    Each deployer owns one, so only its own calls are metered.
+    """
+
+    def __init__(self, platform: str, pool_size: int = 16):
+        super().__init__()
+        self.platform = platform
+        # Room for every concurrent upload worker to keep its connection
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def send(self, request, **kwargs):
+        sent = _body_size(request)
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            record(self.platform, api_calls=1, api_errors=1, api_bytes_sent=sent)
+            raise
+        record(self.platform, api_calls=1, api_errors=int(response.status_code >= 400),
+               api_bytes_sent=sent, api_bytes_received=_received_size(response, kwargs.get('stream')))
+        return response
+
+
+def _body_size(request) -> int:
+    if isinstance(request.body, (bytes, str)):
+        return len(request.body)
+    # Streamed file bodies: requests sets Content-Length from the file size
+    return int(request.headers.get('Content-Length') or 0)
+
+
+def _received_size(response, stream: bool) -> int:
+    """Body bytes as they came over the wire (compressed, chunked or not)"""
+    if stream:
+        return int(response.headers.get('Content-Length') or 0)
+    content = response.content
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(content)
+
+
+def begin(platform: str):
+    """Start measuring a platform's deploy"""
+    with _lock:
+        _platforms[platform] = {**dict.fromkeys(COUNTERS, 0), '_started': time.perf_counter()}
+
+
+def end(platform: str, status: str | None = None) -> float:
+    """Stop measuring a platform; returns its wall time in seconds"""
+    with _lock:
+        metrics = _platforms[platform]
+        wall = time.perf_counter() - metrics.pop('_started')
+        metrics['wall_seconds'] = round(wall, 3)
+        metrics['status'] = status
+    return wall
+
+
+def record(platform: str, **counters):
+    """Add to a platform's counters (see COUNTERS)"""
+    with _lock:
+        metrics = _platforms.setdefault(platform, dict.fromkeys(COUNTERS, 0))
+        for key, value in counters.items():
+            metrics[key] = metrics.get(key, 0) + value
+
+
+def count_retry(platform: str):
+    record(platform, retries=1)
+
+
+def record_build(seconds: float | None):
+    """Note how long the build took (None when an existing dist was reused)"""
+    global _build_seconds
+    _build_seconds = round(seconds, 3) if seconds is not None else None
+
+
+def _previous_report() -> dict | None:
+    try:
+        with open(HISTORY_FILE, 'rb') as f:
+            f.seek(0, 2)
+            f.seek(max(0, f.tell() - 65536))
+            lines = f.read().splitlines()
+        return json.loads(lines[-1]) if lines else None
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def build_report(statuses: dict[str, str], dist_dir: Path = DIST_DIR) -> dict:
+    """Assemble this run's metrics into a JSON-serialisable report
+
+    statuses maps display name → 'deployed', 'skipped' or 'failed'.
+    """
+    from dist_manifest import get_dist_manifest
+
+    manifest = get_dist_manifest(dist_dir) if dist_dir.exists() else None
+    dist_bytes = manifest.total_size if manifest else 0
+    previous = _previous_report()
+    previous_bytes = previous['dist']['bytes'] if previous else None
+
+    platforms = {}
+    with _lock:
+        for name, status in statuses.items():
+            metrics = {k: v for k, v in _platforms.get(name.lower(), {}).items() if not k.startswith('_')}
+            metrics['status'] = status
+            metrics['bytes_skipped'] = max(dist_bytes - metrics.get('bytes_uploaded', 0), 0)
+            platforms[name] = metrics
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'build_seconds': _build_seconds,
+        'dist': {
+            'files': len(manifest) if manifest else 0,
+            'bytes': dist_bytes,
+            'bytes_delta': dist_bytes - previous_bytes if previous_bytes is not None else None,
+        },
+        'platforms': platforms,
+    }
+
+
+def save_report(report: dict) -> Path:
+    """Write deploy_report.json and append the report to the perf history"""
+    REPORT_FILE.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report) + '\n')
+    return REPORT_FILE
+
+
+def format_platform(metrics: dict) -> str:
+    """One-line summary of a platform's metrics for text reports"""
+    from manage_files import format_size
+
+    parts = []
+    if metrics.get('wall_seconds') is not None:
+        parts.append(f"{metrics['wall_seconds']:.1f}s")
+    parts.append(f"{metrics.get('files_uploaded', 0)} files / "
+                 f"{format_size(metrics.get('bytes_uploaded', 0))} uploaded, "
+                 f"{format_size(metrics.get('bytes_skipped', 0))} skipped")
+    if metrics.get('files_changed'):
+        parts.append(f"{metrics['files_changed']} files changed")
+    parts.append(f"{metrics.get('api_calls', 0)} API calls")
+    if metrics.get('api_errors'):
+        parts.append(f"{metrics['api_errors']} errors")
+    if metrics.get('retries'):
+        parts.append(f"{metrics['retries']} retries")
+    return ', '.join(parts)
@@ -2,13 +2,17 @@
 Deploy Oriz to Neocities
 """
 
-import requests
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 from config import NEOCITIES, PROJECT_ROOT, DIST_DIR
 from build import build_project, ensure_dist_exists
+from deploy_plan import diff_manifests
+from dist_manifest import get_dist_manifest
+from deploy_metrics import MeteredSession, record
+
+_session = MeteredSession('neocities')
 
 
 def deploy_to_neocities():
@@ -29,6 +33,30 @@ def deploy_to_neocities():
         if not build_project(PROJECT_ROOT):
             return False
 
+    # Collect all files to upload
+    files_to_upload = [(f.path, f.abs_path) for f in get_dist_manifest()]
+    return _upload_files(files_to_upload)
+
+
+def deploy_dir(dist_dir: Path) -> bool:
+    """Upload only the files that differ from what the site serves
+
+    Files the site has but dist_dir lacks are left in place.
+    """
+    plan = plan_deploy(dist_dir)
+    changed = set(plan['added']) | set(plan['modified'])
+
+    if not changed:
+        print("✅ Neocities already serves these files")
+        return True
+
+    record('neocities', files_changed=len(changed))
+    manifest = get_dist_manifest(dist_dir)
+    return _upload_files([(path, manifest.get(path).abs_path) for path in sorted(changed)])
+
+
+def _upload_files(files_to_upload: list) -> bool:
+    """Upload (name, path) pairs to Neocities in batches"""
     # Neocities API endpoint
     url = "https://neocities.org/api/upload"
 
@@ -36,13 +64,6 @@ def deploy_to_neocities():
         'Authorization': f"Bearer {NEOCITIES['api_key']}"
     }
 
-    # Collect all files to upload
-    files_to_upload = []
-    for file_path in DIST_DIR.rglob('*'):
-        if file_path.is_file():
-            relative_path = file_path.relative_to(DIST_DIR)
-            files_to_upload.append((str(relative_path), file_path))
-
     print(f"📤 Uploading {len(files_to_upload)} files...")
 
     success_count = 0
@@ -62,7 +83,7 @@ def deploy_to_neocities():
                 error_count += 1
 
         try:
-            response = requests.post(url, headers=headers, files=files)
+            response = _session.post(url, headers=headers, files=files, timeout=120)
 
             # Close file handles
             for _, (_, f) in files:
@@ -72,6 +93,8 @@ def deploy_to_neocities():
                 result = response.json()
                 if result.get('result') == 'success':
                     success_count += len(batch)
+                    record('neocities', files_uploaded=len(batch),
+                           bytes_uploaded=sum(Path(path).stat().st_size for _, path in batch))
                     print(f"   ✓ Uploaded batch {i // batch_size + 1}")
                 else:
                     print(f"   ⚠️ Batch warning: {result}")
@@ -92,6 +115,36 @@ def deploy_to_neocities():
         return success_count > 0
 
 
+def plan_deploy(dist_dir: Path = DIST_DIR) -> dict:
+    """Diff dist against the files on the Neocities site (no uploads)"""
+    manifest = get_dist_manifest(dist_dir)
+    manifest.hash_all()
+    local = {f.path: (f.digest('sha1'), f.size) for f in manifest}
+
+    return diff_manifests(local, _fetch_remote_manifest())
+
+
+def _fetch_remote_manifest() -> dict | None:
+    """Return {'path': sha1} for every file on the site, or None"""
+    try:
+        response = _session.get(
+            "https://neocities.org/api/list",
+            headers={'Authorization': f"Bearer {NEOCITIES['api_key']}"},
+            timeout=30,
+        )
+        result = response.json()
+        if result.get('result') != 'success':
+            return None
+        return {
+            f['path']: f['sha1_hash']
+            for f in result.get('files', [])
+            if not f.get('is_directory')
+        }
+    except Exception as e:
+        print(f"   ⚠️ Could not fetch Neocities manifest: {e}")
+        return None
+
+
 if __name__ == '__main__':
     print("=" * 50)
     print("📦 Oriz → Neocities Deployment")
@@ -2,18 +2,28 @@
 Deploy Oriz to Netlify
 """
 
-import requests
-import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import quote
 
 sys.path.insert(0, str(Path(__file__).parent))
-from config import NETLIFY, PROJECT_ROOT, DIST_DIR
+from config import NETLIFY, PROJECT_ROOT, DIST_DIR, CACHE_DIR, DEPLOY_WORKERS
 from build import build_project, ensure_dist_exists
+from runner import run_command
+from dist_manifest import get_dist_manifest
+from deploy_metrics import MeteredSession, record, count_retry
+from deploy_plan import diff_manifests
+from deploy_state import REMOTE_PREFIX, dist_content_hash, parse_remote_hash
+
+_session = MeteredSession('netlify')
+
+API_URL = "https://api.netlify.com/api/v1"
 
 
 def deploy_to_netlify():
-    """Deploy to Netlify using CLI or API"""
+    """Deploy to Netlify using file digests, falling back to zip upload"""
     print("\n🚀 Deploying to Netlify...")
 
     if not NETLIFY['enabled']:
@@ -30,36 +40,44 @@ def deploy_to_netlify():
         if not build_project(PROJECT_ROOT):
             return False
 
+    return deploy_dir(DIST_DIR)
+
+
+def deploy_dir(dist_dir: Path) -> bool:
+    """Deploy a directory: digest upload first, zip upload as fallback"""
+    if deploy_via_digest(dist_dir):
+        return True
+
+    print("⚠️ Digest deploy failed, falling back to zip upload...")
+    return deploy_via_api(dist_dir)
+
+
+def deploy_via_cli():
+    """Deploy using the Netlify CLI"""
+    print("📤 Deploying via Netlify CLI...")
+
     try:
-        # Use Netlify CLI
-        cmd = ['npx', 'netlify', 'deploy', '--prod', '--dir=dist']
+        args = ['deploy', '--prod', '--dir=dist']
 
         if NETLIFY.get('site_id'):
-            cmd.extend(['--site', NETLIFY['site_id']])
-
-        result = subprocess.run(
-            cmd,
-            cwd=PROJECT_ROOT,
-            capture_output=True,
-            text=True,
-            shell=True,
-            encoding='utf-8',
-            errors='replace',
-            env={
-                **dict(__import__('os').environ),
-                'NETLIFY_AUTH_TOKEN': NETLIFY['auth_token'],
-            }
+            args.extend(['--site', NETLIFY['site_id']])
+
+        result = run_command(
+            'netlify',
+            args,
+            prefix='netlify',
+            env={'NETLIFY_AUTH_TOKEN': NETLIFY['auth_token']},
         )
 
-        if result.returncode != 0:
-            print(f"❌ Deployment failed:\n{result.stderr}")
+        if not result.ok:
+            print("❌ Deployment failed")
             # Try API method as fallback
             return deploy_via_api()
 
         print("✅ Deployed to Netlify!")
 
         # Extract URL from output
-        for line in result.stdout.split('\n'):
+        for line in result.output.split('\n'):
             if 'Website URL' in line or 'https://' in line:
                 print(f"   🌐 {line.strip()}")
 
@@ -73,34 +91,203 @@ def deploy_to_netlify():
         return False
 
 
-def deploy_via_api():
-    """Deploy using Netlify API (zip upload)"""
-    import zipfile
-    import io
+def deploy_via_digest(dist_dir: Path = DIST_DIR):
+    """Deploy using the Netlify file digest API (upload only missing files)"""
+    print("📤 Deploying via Netlify digest API...")
 
-    print("📤 Deploying via Netlify API...")
+    files = _collect_file_digests(dist_dir)
+    headers = _get_headers()
 
-    # Create zip of dist folder
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for file_path in DIST_DIR.rglob('*'):
-            if file_path.is_file():
-                arcname = file_path.relative_to(DIST_DIR)
-                zip_file.write(file_path, arcname)
+    # Step 1: Send the SHA-1 manifest, Netlify answers with what it lacks
+    url = f"{API_URL}/sites/{NETLIFY['site_id']}/deploys"
+    manifest = {path: sha1 for path, (sha1, _) in files.items()}
 
-    zip_buffer.seek(0)
+    try:
+        response = _session.post(url, headers=headers, json={
+            'files': manifest,
+            'title': f"{REMOTE_PREFIX}{dist_content_hash(dist_dir)}",
+        }, timeout=120)
+        if response.status_code not in [200, 201]:
+            print(f"❌ API error: {response.status_code} - {response.text}")
+            return False
+        deploy = response.json()
+    except Exception as e:
+        print(f"❌ API error: {e}")
+        return False
 
-    # Deploy via API
-    url = f"https://api.netlify.com/api/v1/sites/{NETLIFY['site_id']}/deploys"
+    deploy_id = deploy['id']
+    required = set(deploy.get('required', []))
+
+    # Several paths may share one digest; Netlify needs each digest once
+    uploads = {}
+    for path, (sha1, file_path) in files.items():
+        if sha1 in required and sha1 not in uploads:
+            uploads[sha1] = (path, file_path)
+
+    record('netlify', files_changed=sum(1 for sha1, _ in files.values() if sha1 in required))
+    print(f"   📋 {len(files)} files, {len(uploads)} to upload")
+
+    # Step 2: Upload the missing files concurrently
+    failed = 0
+    if uploads:
+        with ThreadPoolExecutor(max_workers=DEPLOY_WORKERS) as executor:
+            futures = {
+                executor.submit(_upload_file, deploy_id, path, file_path): (path, file_path)
+                for path, file_path in uploads.values()
+            }
+            for future in as_completed(futures):
+                path, file_path = futures[future]
+                if future.result():
+                    record('netlify', files_uploaded=1, bytes_uploaded=file_path.stat().st_size)
+                    print(f"   ✓ {path}")
+                else:
+                    print(f"   ❌ {path}")
+                    failed += 1
+
+    if failed:
+        print(f"❌ {failed} uploads failed")
+        return False
+
+    # Step 3: Wait for Netlify to process the deploy
+    result = _wait_for_deploy(deploy_id)
+    if not result:
+        return False
+
+    print("✅ Deployed to Netlify!")
+    print(f"   🌐 {result.get('ssl_url', result.get('url'))}")
+    return True
+
+
+def plan_deploy(dist_dir: Path = DIST_DIR) -> dict:
+    """Diff dist against the files Netlify currently serves (no uploads)"""
+    manifest = get_dist_manifest(dist_dir)
+    manifest.hash_all()
+    local = {f"/{f.path}": (f.digest('sha1'), f.size) for f in manifest}
+    return diff_manifests(local, _fetch_remote_manifest())
+
+
+def _fetch_remote_manifest() -> dict | None:
+    """Return {'/path': sha1} for the site's published deploy, or None"""
+    url = f"{API_URL}/sites/{NETLIFY['site_id']}/files"
+    manifest = {}
+    page = 1
+
+    try:
+        while True:
+            response = _session.get(url, headers=_get_headers(), params={'page': page, 'per_page': 1000}, timeout=30)
+            if response.status_code != 200:
+                return None
+            files = response.json()
+            for f in files:
+                manifest[f['path']] = f['sha']
+            if len(files) < 1000:
+                return manifest
+            page += 1
+    except Exception as e:
+        print(f"   ⚠️ Could not fetch Netlify manifest: {e}")
+        return None
+
+
+def fetch_deployed_hash() -> str | None:
+    """Return the dist hash stored on the published deploy, if any"""
+    response = _session.get(f"{API_URL}/sites/{NETLIFY['site_id']}", headers=_get_headers(), timeout=30)
+    published = response.json().get('published_deploy') or {}
+    return parse_remote_hash(published.get('title'))
+
+
+def _collect_file_digests(dist_dir: Path) -> dict:
+    """Map '/relative/path' → (sha1, file path) for every file in dist"""
+    manifest = get_dist_manifest(dist_dir)
+    manifest.hash_all()
+    return {f"/{f.path}": (f.digest('sha1'), f.abs_path) for f in manifest}
+
+
+def _upload_file(deploy_id: str, path: str, file_path: Path, attempts: int = 3) -> bool:
+    """Upload a single file to a pending deploy, retrying transient failures"""
+    url = f"{API_URL}/deploys/{deploy_id}/files{quote(path)}"
     headers = {
+        **_get_headers(),
+        'Content-Type': 'application/octet-stream',
+    }
+
+    for attempt in range(attempts):
+        if attempt:
+            count_retry('netlify')
+        try:
+            with open(file_path, 'rb') as f:
+                response = _session.put(url, headers=headers, data=f, timeout=120)
+            if response.status_code in [200, 201]:
+                return True
+            if response.status_code < 500 and response.status_code != 429:
+                return False
+        except Exception:
+            pass
+        if attempt < attempts - 1:
+            time.sleep(2 ** attempt)
+
+    return False
+
+
+def _wait_for_deploy(deploy_id: str, timeout: int = 300) -> dict | None:
+    """Poll a deploy until it is ready; return the deploy or None on failure"""
+    url = f"{API_URL}/deploys/{deploy_id}"
+    deadline = time.monotonic() + timeout
+    delay = 1
+
+    while time.monotonic() < deadline:
+        try:
+            response = _session.get(url, headers=_get_headers(), timeout=30)
+            deploy = response.json()
+        except Exception as e:
+            print(f"   ⚠️ Could not poll deploy: {e}")
+            deploy = {}
+
+        state = deploy.get('state')
+        if state == 'ready':
+            return deploy
+        if state == 'error':
+            print(f"❌ Deploy failed: {deploy.get('error_message')}")
+            return None
+
+        time.sleep(delay)
+        delay = min(delay * 2, 10)
+
+    print(f"❌ Timed out waiting for deploy {deploy_id}")
+    return None
+
+
+def _get_headers() -> dict:
+    """Get Netlify API headers"""
+    return {
         'Authorization': f"Bearer {NETLIFY['auth_token']}",
+    }
+
+
+def deploy_via_api(dist_dir: Path = DIST_DIR):
+    """Deploy using Netlify API (zip upload)"""
+    print("📤 Deploying via Netlify API...")
+
+    try:
+        archive = _get_dist_archive(dist_dir)
+    except Exception as e:
+        print(f"❌ Could not create archive: {e}")
+        return False
+
+    # Deploy via API
+    url = f"{API_URL}/sites/{NETLIFY['site_id']}/deploys"
+    headers = {
+        **_get_headers(),
         'Content-Type': 'application/zip',
+        'Content-Length': str(archive.stat().st_size),
     }
 
     try:
-        response = requests.post(url, headers=headers, data=zip_buffer.read())
+        # Passing the open file lets requests stream it in chunks
+        with open(archive, 'rb') as f:
+            response = _session.post(url, headers=headers, data=f, timeout=120)
 
         if response.status_code in [200, 201]:
+            record('netlify', files_uploaded=len(get_dist_manifest(dist_dir)), bytes_uploaded=archive.stat().st_size)
             result = response.json()
             print("✅ Deployed to Netlify!")
             print(f"   🌐 {result.get('ssl_url', result.get('url'))}")
@@ -114,10 +301,46 @@ def deploy_via_api():
         return False
 
 
+def _get_dist_archive(dist_dir: Path) -> Path:
+    """Return a zip of dist on disk, reusing the cached one if dist is unchanged"""
+    import zipfile
+
+    manifest = get_dist_manifest(dist_dir)
+
+    # Fingerprint dist by path, size and mtime — no file contents are read
+    archive_dir = CACHE_DIR / 'netlify'
+    archive = archive_dir / f"dist-{manifest.fingerprint()[:16]}.zip"
+
+    if archive.exists():
+        print(f"   ♻️ Reusing cached archive: {archive.name}")
+        return archive
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    tmp_archive = archive.with_suffix('.zip.tmp')
+
+    # ZipFile.write copies each file in chunks, so memory stays flat
+    with zipfile.ZipFile(tmp_archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for f in manifest:
+            zip_file.write(f.abs_path, f.path)
+
+    tmp_archive.replace(archive)
+
+    # Only the latest archive is worth keeping
+    for old in archive_dir.glob('dist-*.zip'):
+        if old != archive:
+            old.unlink(missing_ok=True)
+
+    print(f"   📦 Created archive: {archive.name}")
+    return archive
+
+
 if __name__ == '__main__':
     print("=" * 50)
     print("📦 Oriz → Netlify Deployment")
     print("=" * 50)
 
-    success = deploy_to_netlify()
+    if '--cli' in sys.argv[1:]:
+        success = deploy_via_cli()
+    else:
+        success = deploy_to_netlify()
     sys.exit(0 if success else 1)
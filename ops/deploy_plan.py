@@ -0,0 +1,134 @@
+"""
+Deploy dry-run for Oriz
+Diffs local dist against each platform's remote manifest without uploading
+"""
+
+import importlib
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import get_enabled_platforms
+
+
+def diff_manifests(local: dict, remote: dict | None) -> dict:
+    """Diff a local {path: (hash, size)} manifest against a remote {path: hash}
+
+    Platforms store files by content, so only hashes the remote doesn't
+    already have count towards the upload. A remote of None means the
+    platform's state is unknown and everything is treated as new.
+
+    'known' says whether the upload figures are reliable; 'exact' says
+    whether they came from a full remote file listing.
+    """
+    total_bytes = sum(size for _, size in local.values())
+
+    if remote is None:
+        return {
+            'added': sorted(local),
+            'modified': [],
+            'deleted': [],
+            'upload_files': len({h for h, _ in local.values()}),
+            'upload_bytes': total_bytes,
+            'total_files': len(local),
+            'total_bytes': total_bytes,
+            'known': False,
+            'exact': False,
+        }
+
+    added = sorted(p for p in local if p not in remote)
+    modified = sorted(p for p in local if p in remote and remote[p] != local[p][0])
+    deleted = sorted(p for p in remote if p not in local)
+
+    remote_hashes = set(remote.values())
+    to_upload = {h: size for h, size in local.values() if h not in remote_hashes}
+
+    return {
+        'added': added,
+        'modified': modified,
+        'deleted': deleted,
+        'upload_files': len(to_upload),
+        'upload_bytes': sum(to_upload.values()),
+        'total_files': len(local),
+        'total_bytes': total_bytes,
+        'known': True,
+        'exact': True,
+    }
+
+
+# Enabled-platform key → (display name, deployer module)
+PLATFORM_MODULES = {
+    'cloudflare': ('Cloudflare', 'deploy_cf'),
+    'netlify': ('Netlify', 'deploy_netlify'),
+    'vercel': ('Vercel', 'deploy_vercel'),
+    'surge': ('Surge', 'deploy_surge'),
+    'neocities': ('Neocities', 'deploy_neocities'),
+}
+
+
+def get_platform_modules() -> dict:
+    """Map display name → (platform key, imported deployer module) for enabled platforms"""
+    modules = {}
+    for platform in get_enabled_platforms():
+        name, module_name = PLATFORM_MODULES[platform]
+        modules[name] = (platform, importlib.import_module(module_name))
+    return modules
+
+
+def _get_planners() -> dict:
+    """Map display name → plan function for every enabled platform"""
+    return {name: module.plan_deploy for name, (_, module) in get_platform_modules().items()}
+
+
+def plan_all(verbose: bool = False) -> dict:
+    """Fetch every platform's remote manifest concurrently and print the diff"""
+    from manage_files import format_size
+
+    print("\n🗺️ Deployment Plan (dry run — nothing is uploaded)")
+    print("=" * 60)
+
+    planners = _get_planners()
+    if not planners:
+        print("⚠️ No deployment platforms enabled!")
+        return {}
+
+    plans = {}
+    with ThreadPoolExecutor(max_workers=len(planners)) as executor:
+        futures = {executor.submit(fn): name for name, fn in planners.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                plans[name] = future.result()
+            except Exception as e:
+                print(f"  ❌ {name}: {e}")
+                plans[name] = None
+
+    for name in planners:
+        plan = plans.get(name)
+        if plan is None:
+            print(f"\n  {name}: ❌ could not build plan")
+            continue
+
+        changes = len(plan['added']) + len(plan['modified']) + len(plan['deleted'])
+        if plan['known'] and changes == 0 and plan['upload_files'] == 0:
+            print(f"\n  {name}: ✅ up to date ({plan['total_files']} files)")
+            continue
+
+        print(f"\n  {name}: +{len(plan['added'])} ~{len(plan['modified'])} -{len(plan['deleted'])} files, "
+              f"{format_size(plan['upload_bytes'])} to upload "
+              f"(of {format_size(plan['total_bytes'])})")
+        if plan.get('note'):
+            print(f"     ℹ️ {plan['note']}")
+
+        if verbose:
+            for label, key in (('+', 'added'), ('~', 'modified'), ('-', 'deleted')):
+                for path in plan[key]:
+                    print(f"     {label} {path}")
+
+    return plans
+
+
+if __name__ == '__main__':
+    plans = plan_all(verbose='--verbose' in sys.argv[1:])
+    sys.exit(0 if all(plans.values()) else 1)
@@ -0,0 +1,112 @@
+"""
+Deploy state tracking for Oriz
+Records the dist content hash each platform last deployed so unchanged
+deploys can be skipped
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR, DIST_DIR
+from dist_manifest import get_dist_manifest
+
+STATE_FILE = CACHE_DIR / 'deploy_state.json'
+
+# Prefix used when a platform lets us store the hash as deploy metadata
+REMOTE_PREFIX = 'oriz-dist:'
+
+_state_lock = threading.Lock()
+
+
+def dist_content_hash(dist_dir: Path = DIST_DIR) -> str:
+    """Hash the paths and contents of every file in dist"""
+    manifest = get_dist_manifest(dist_dir)
+    manifest.hash_all()
+
+    content = hashlib.sha256()
+    for f in manifest:
+        content.update(f"{f.path}\0{f.digest('sha256')}\n".encode())
+    return content.hexdigest()
+
+
+def load_state() -> dict:
+    """Load the per-platform deploy state"""
+    try:
+        return json.loads(STATE_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _update_state(platform: str, **changes):
+    """Apply changes to one platform's entry and save"""
+    with _state_lock:
+        state = load_state()
+        entry = state.setdefault(platform, {})
+        for key, value in changes.items():
+            if callable(value):
+                value = value(entry.get(key))
+            entry[key] = value
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        STATE_FILE.write_text(json.dumps(state, indent=2), encoding='utf-8')
+
+
+def record_deploy(platform: str, dist_hash: str):
+    """Remember that a platform now serves this dist"""
+    _update_state(
+        platform,
+        dist_hash=dist_hash,
+        deployed_at=datetime.now().isoformat(timespec='seconds'),
+        skips=0,
+    )
+
+
+def record_skip(platform: str):
+    """Count a skipped deploy for a platform"""
+    _update_state(platform, skips=lambda n: (n or 0) + 1)
+
+
+def parse_remote_hash(value: str | None) -> str | None:
+    """Extract a dist hash stored as remote deploy metadata"""
+    if value and value.startswith(REMOTE_PREFIX):
+        return value[len(REMOTE_PREFIX):]
+    return None
+
+
+def is_up_to_date(platform: str, dist_hash: str, remote_hash_fn=None) -> bool:
+    """Check local state, then the platform's own metadata if it has any"""
+    if load_state().get(platform, {}).get('dist_hash') == dist_hash:
+        return True
+
+    if remote_hash_fn is not None:
+        try:
+            return remote_hash_fn() == dist_hash
+        except Exception as e:
+            print(f"   ⚠️ Could not read remote deploy hash: {e}")
+
+    return False
+
+
+def deploy_if_changed(platform: str, deploy_fn, remote_hash_fn=None, force: bool = False) -> str:
+    """Run a deploy unless the platform already serves this dist
+
+    Returns 'deployed', 'skipped' or 'failed'.
+    """
+    dist_hash = dist_content_hash()
+
+    if not force and is_up_to_date(platform, dist_hash, remote_hash_fn):
+        print(f"\n⏭️ {platform}: skipped, up to date ({dist_hash[:12]})")
+        record_skip(platform)
+        return 'skipped'
+
+    if not deploy_fn():
+        return 'failed'
+
+    # Record the hash checked above: it is what the remote markers carry,
+    # and deployers must not change dist (Surge stages its 200.html)
+    record_deploy(platform, dist_hash)
+    return 'deployed'
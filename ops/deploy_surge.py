@@ -2,13 +2,18 @@
 Deploy Oriz to Surge.sh
 """
 
-import subprocess
+import os
+import shutil
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from config import SURGE, PROJECT_ROOT, DIST_DIR
+from config import SURGE, PROJECT_ROOT, DIST_DIR, CACHE_DIR
 from build import build_project, ensure_dist_exists
+from runner import run_command
+from dist_manifest import get_dist_manifest
+from deploy_plan import diff_manifests
+from deploy_metrics import record
 
 
 def deploy_to_surge():
@@ -29,31 +34,54 @@ def deploy_to_surge():
         if not build_project(PROJECT_ROOT):
             return False
 
-    # Copy index.html to 200.html for SPA routing
-    index_html = DIST_DIR / 'index.html'
-    spa_html = DIST_DIR / '200.html'
-    if index_html.exists() and not spa_html.exists():
-        spa_html.write_text(index_html.read_text(encoding='utf-8'), encoding='utf-8')
+    return deploy_dir(DIST_DIR)
 
+
+STAGE_DIR = CACHE_DIR / 'surge_stage'
+
+
+def _link_or_copy(src, dst):
     try:
-        result = subprocess.run(
-            ['npx', 'surge', str(DIST_DIR), SURGE['domain']],
-            cwd=PROJECT_ROOT,
-            capture_output=True,
-            text=True,
-            shell=True,
-            encoding='utf-8',
-            errors='replace',
-            env={
-                **dict(__import__('os').environ),
-                'SURGE_TOKEN': SURGE['token'],
-            }
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _stage(dist_dir: Path) -> Path:
+    """Hard-linked copy of dist_dir with 200.html added for SPA routing
+
+    dist itself is left untouched, so its content hash (and every other
+    platform's skip check) doesn't change because of Surge.
+    """
+    index_html = dist_dir / 'index.html'
+    if not index_html.exists() or (dist_dir / '200.html').exists():
+        return dist_dir
+
+    shutil.rmtree(STAGE_DIR, ignore_errors=True)
+    shutil.copytree(dist_dir, STAGE_DIR, copy_function=_link_or_copy)
+    shutil.copy2(index_html, STAGE_DIR / '200.html')
+    return STAGE_DIR
+
+
+def deploy_dir(dist_dir: Path) -> bool:
+    """Publish a directory with the Surge CLI (always a full upload)"""
+    staged = None
+    try:
+        staged = _stage(dist_dir)
+        result = run_command(
+            'surge',
+            [str(staged), SURGE['domain']],
+            prefix='surge',
+            env={'SURGE_TOKEN': SURGE['token']},
         )
 
-        if result.returncode != 0:
-            print(f"❌ Deployment failed:\n{result.stderr}")
+        if not result.ok:
+            print("❌ Deployment failed")
             return False
 
+        manifest = get_dist_manifest(dist_dir)
+        record('surge', files_uploaded=len(manifest), bytes_uploaded=manifest.total_size)
         print(f"✅ Deployed to Surge!")
         print(f"   🌐 https://{SURGE['domain']}")
         return True
@@ -64,6 +92,18 @@ def deploy_to_surge():
     except Exception as e:
         print(f"❌ Deployment error: {e}")
         return False
+    finally:
+        if staged == STAGE_DIR:
+            shutil.rmtree(STAGE_DIR, ignore_errors=True)
+
+
+def plan_deploy(dist_dir: Path = DIST_DIR) -> dict:
+    """Surge exposes no file manifest, so every deploy is a full upload"""
+    local = {f.path: (f.path, f.size) for f in get_dist_manifest(dist_dir)}
+
+    plan = diff_manifests(local, None)
+    plan['note'] = "Surge has no remote manifest; every deploy re-uploads dist"
+    return plan
 
 
 if __name__ == '__main__':
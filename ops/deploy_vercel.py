@@ -2,17 +2,27 @@
 Deploy Oriz to Vercel
 """
 
-import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from config import VERCEL, PROJECT_ROOT, DIST_DIR
+from config import VERCEL, PROJECT_ROOT, DIST_DIR, DEPLOY_WORKERS
 from build import build_project, ensure_dist_exists
+from runner import run_command
+from dist_manifest import get_dist_manifest
+from deploy_metrics import MeteredSession, record, count_retry
+from deploy_plan import diff_manifests
+from deploy_state import REMOTE_PREFIX, dist_content_hash, parse_remote_hash
+
+_session = MeteredSession('vercel')
+
+API_URL = "https://api.vercel.com"
 
 
 def deploy_to_vercel():
-    """Deploy to Vercel using CLI"""
+    """Deploy to Vercel using the deployments API"""
     print("\n🚀 Deploying to Vercel...")
 
     if not VERCEL['enabled']:
@@ -29,34 +39,288 @@ def deploy_to_vercel():
         if not build_project(PROJECT_ROOT):
             return False
 
+    return deploy_dir(DIST_DIR)
+
+
+def deploy_dir(dist_dir: Path) -> bool:
+    """Deploy a directory via the API and print the outcome"""
+    result = deploy_via_api(dist_dir)
+    if not result:
+        return False
+
+    timings = ', '.join(f"{k} {v:.1f}s" for k, v in result['timings'].items())
+    print("✅ Deployed to Vercel!")
+    print(f"   🌐 {result['url']}")
+    print(f"   📤 {result['files_uploaded']}/{result['files_total']} files, "
+          f"{result['bytes_uploaded']} bytes uploaded ({result['bytes_skipped']} skipped)")
+    print(f"   ⏱️ {timings}")
+    return True
+
+
+def deploy_via_api(dist_dir: Path = DIST_DIR) -> dict | None:
+    """Deploy dist by SHA, uploading only files Vercel doesn't already store
+
+    Returns a dict with url, deployment_id, file/byte counts and per-step
+    timings, or None on failure.
+    """
+    started = time.monotonic()
+    timings = {}
+
+    files = _collect_files(dist_dir)
+    timings['hash'] = time.monotonic() - started
+
+    # Step 1: Create the deployment; Vercel lists any SHAs it is missing
+    step = time.monotonic()
+    response = _create_deployment(files, dist_dir)
+    if response is None:
+        return None
+
+    uploaded, bytes_uploaded = 0, 0
+    if response.get('error', {}).get('code') == 'missing_files':
+        missing = set(response['error'].get('missing', []))
+        record('vercel', files_changed=sum(1 for sha, _, _ in files.values() if sha in missing))
+        by_sha = {sha: (file_path, size) for _, (sha, size, file_path) in files.items()}
+
+        # Step 2: Upload the missing files concurrently, then retry the create
+        failed = 0
+        with ThreadPoolExecutor(max_workers=DEPLOY_WORKERS) as executor:
+            futures = {
+                executor.submit(_upload_file, sha, *by_sha[sha]): sha
+                for sha in missing if sha in by_sha
+            }
+            for future in as_completed(futures):
+                sha = futures[future]
+                if future.result():
+                    uploaded += 1
+                    bytes_uploaded += by_sha[sha][1]
+                    record('vercel', files_uploaded=1, bytes_uploaded=by_sha[sha][1])
+                else:
+                    failed += 1
+
+        if failed:
+            print(f"❌ {failed} uploads failed")
+            return None
+
+        timings['upload'] = time.monotonic() - step
+        step = time.monotonic()
+        response = _create_deployment(files, dist_dir)
+        if response is None:
+            return None
+
+    if 'error' in response:
+        print(f"❌ Deployment failed: {response['error']}")
+        return None
+
+    timings['create'] = time.monotonic() - step
+
+    # Step 3: Wait for the deployment to be ready
+    step = time.monotonic()
+    deployment = _wait_for_deployment(response['id'])
+    if not deployment:
+        return None
+    timings['ready'] = time.monotonic() - step
+    timings['total'] = time.monotonic() - started
+
+    bytes_total = sum(size for _, size, _ in files.values())
+    return {
+        'url': f"https://{deployment.get('url', response.get('url'))}",
+        'deployment_id': response['id'],
+        'files_total': len(files),
+        'files_uploaded': uploaded,
+        'bytes_uploaded': bytes_uploaded,
+        'bytes_skipped': bytes_total - bytes_uploaded,
+        'timings': timings,
+    }
+
+
+def plan_deploy(dist_dir: Path = DIST_DIR) -> dict:
+    """Diff dist against the current production deployment (no uploads)"""
+    local = {name: (sha, size) for name, (sha, size, _) in _collect_files(dist_dir).items()}
+    return diff_manifests(local, _fetch_remote_manifest())
+
+
+def fetch_deployed_hash() -> str | None:
+    """Return the dist hash stored on the production deployment, if any"""
+    deployment = _latest_production_deployment() or {}
+    return parse_remote_hash((deployment.get('meta') or {}).get('oriz_dist'))
+
+
+def _latest_production_deployment() -> dict | None:
+    """Return the newest ready production deployment, or None if there is none
+
+    Raises RuntimeError when Vercel can't be asked, so callers can tell
+    "nothing deployed yet" from "unknown".
+    """
+    params = {**_get_params(), 'target': 'production', 'state': 'READY', 'limit': 1}
+    if VERCEL.get('project_id'):
+        params['projectId'] = VERCEL['project_id']
+    else:
+        params['app'] = VERCEL['project_name']
+
+    response = _session.get(f"{API_URL}/v6/deployments", headers=_get_headers(), params=params, timeout=30)
+    body = response.json() if response.status_code == 200 else {}
+    if 'deployments' not in body:
+        raise RuntimeError(f"listing deployments failed: HTTP {response.status_code}")
+    deployments = body['deployments']
+    return deployments[0] if deployments else None
+
+
+def _fetch_remote_manifest() -> dict | None:
+    """Return {'dist/path': sha1} for the latest production deployment, or None"""
     try:
-        # Create vercel.json for static deployment
-        vercel_config = PROJECT_ROOT / 'vercel.json'
-        if not vercel_config.exists():
-            vercel_config.write_text('{"outputDirectory": "dist"}')
+        deployment = _latest_production_deployment()
+        if not deployment:
+            return {}
 
+        uid = deployment['uid']
+        response = _session.get(f"{API_URL}/v6/deployments/{uid}/files", headers=_get_headers(),
+                                params=_get_params(), timeout=30)
+        if response.status_code != 200:
+            return None
+    except Exception as e:
+        print(f"   ⚠️ Could not fetch Vercel manifest: {e}")
+        return None
+
+    manifest = {}
+
+    def walk(entries, prefix):
+        for entry in entries:
+            path = f"{prefix}{entry['name']}"
+            if entry.get('type') == 'directory':
+                walk(entry.get('children', []), f"{path}/")
+            elif entry.get('type') == 'file':
+                manifest[path] = entry.get('uid')
+
+    walk(response.json(), '')
+    return manifest
+
+
+def _collect_files(dist_dir: Path) -> dict:
+    """Map 'dist/relative/path' → (sha1, size, file path) for every file in dist"""
+    manifest = get_dist_manifest(dist_dir)
+    manifest.hash_all()
+    return {f"dist/{f.path}": (f.digest('sha1'), f.size, f.abs_path) for f in manifest}
+
+
+def _create_deployment(files: dict, dist_dir: Path) -> dict | None:
+    """POST the file manifest; returns the deployment or an error payload"""
+    url = f"{API_URL}/v13/deployments"
+
+    data = {
+        'name': VERCEL['project_name'],
+        'target': 'production',
+        'files': [
+            {'file': name, 'sha': sha, 'size': size}
+            for name, (sha, size, _) in files.items()
+        ],
+        'meta': {'oriz_dist': f"{REMOTE_PREFIX}{dist_content_hash(dist_dir)}"},
+        # dist is already built; Vercel only needs to serve it
+        'projectSettings': {
+            'framework': None,
+            'outputDirectory': 'dist',
+        },
+    }
+    if VERCEL.get('project_id'):
+        data['project'] = VERCEL['project_id']
+
+    try:
+        response = _session.post(url, headers=_get_headers(), params=_get_params(), json=data, timeout=120)
+        return response.json()
+    except Exception as e:
+        print(f"❌ API error: {e}")
+        return None
+
+
+def _upload_file(sha: str, file_path: Path, size: int, attempts: int = 3) -> bool:
+    """Upload a single file keyed by its SHA-1, retrying transient failures"""
+    url = f"{API_URL}/v2/files"
+    headers = {
+        **_get_headers(),
+        'Content-Type': 'application/octet-stream',
+        'Content-Length': str(size),
+        'x-vercel-digest': sha,
+    }
+
+    for attempt in range(attempts):
+        if attempt:
+            count_retry('vercel')
+        try:
+            with open(file_path, 'rb') as f:
+                response = _session.post(url, headers=headers, params=_get_params(), data=f, timeout=120)
+            if response.status_code == 200:
+                return True
+            if response.status_code < 500 and response.status_code != 429:
+                return False
+        except Exception:
+            pass
+        if attempt < attempts - 1:
+            time.sleep(2 ** attempt)
+
+    return False
+
+
+def _wait_for_deployment(deployment_id: str, timeout: int = 300) -> dict | None:
+    """Poll a deployment until it is ready; return it or None on failure"""
+    url = f"{API_URL}/v13/deployments/{deployment_id}"
+    deadline = time.monotonic() + timeout
+    delay = 1
+
+    while time.monotonic() < deadline:
+        try:
+            response = _session.get(url, headers=_get_headers(), params=_get_params(), timeout=30)
+            deployment = response.json()
+        except Exception as e:
+            print(f"   ⚠️ Could not poll deployment: {e}")
+            deployment = {}
+
+        state = deployment.get('readyState')
+        if state == 'READY':
+            return deployment
+        if state in ('ERROR', 'CANCELED'):
+            print(f"❌ Deployment {state.lower()}: {deployment.get('errorMessage', '')}")
+            return None
+
+        time.sleep(delay)
+        delay = min(delay * 2, 10)
+
+    print(f"❌ Timed out waiting for deployment {deployment_id}")
+    return None
+
+
+def _get_headers() -> dict:
+    """Get Vercel API headers"""
+    return {
+        'Authorization': f"Bearer {VERCEL['token']}",
+    }
+
+
+def _get_params() -> dict:
+    """Scope API calls to the team when one is configured"""
+    if VERCEL.get('org_id', '') and VERCEL['org_id'].startswith('team_'):
+        return {'teamId': VERCEL['org_id']}
+    return {}
+
+
+def deploy_via_cli():
+    """Deploy to Vercel using CLI"""
+    print("📤 Deploying via Vercel CLI...")
+
+    try:
         # Deploy using Vercel CLI
-        result = subprocess.run(
-            [
-                'npx', 'vercel', 'deploy', '--prod',
-                '--yes', '--token', VERCEL['token']
-            ],
-            cwd=PROJECT_ROOT,
-            capture_output=True,
-            text=True,
-            shell=True,
-            encoding='utf-8',
-            errors='replace'
+        result = run_command(
+            'vercel',
+            ['deploy', '--prod', '--yes', '--token', VERCEL['token']],
+            prefix='vercel',
         )
 
-        if result.returncode != 0:
-            print(f"❌ Deployment failed:\n{result.stderr}")
+        if not result.ok:
+            print("❌ Deployment failed")
             return False
 
         print("✅ Deployed to Vercel!")
 
         # Extract URL from output
-        for line in result.stdout.split('\n'):
+        for line in result.output.split('\n'):
             if 'https://' in line and 'vercel' in line:
                 print(f"   🌐 {line.strip()}")
 
@@ -75,5 +339,8 @@ if __name__ == '__main__':
     print("📦 Oriz → Vercel Deployment")
     print("=" * 50)
 
-    success = deploy_to_vercel()
+    if '--cli' in sys.argv[1:]:
+        success = deploy_via_cli()
+    else:
+        success = deploy_to_vercel()
     sys.exit(0 if success else 1)
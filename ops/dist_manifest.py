@@ -0,0 +1,143 @@
+"""
+Dist manifest for Oriz
+Walks dist once per run with os.scandir and shares the result (sizes,
+mtimes, lazily computed hashes) between reports and deployers
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import DIST_DIR
+from checksums import DIGESTS, get_checksum_cache, hash_file, hash_files
+
+
+class DistFile:
+    """One file in dist, with stat data from the scan and lazy digests"""
+
+    __slots__ = ('path', 'abs_path', 'size', 'mtime_ns', 'inode', 'ext', '_digests')
+
+    def __init__(self, path: str, abs_path: Path, stat: os.stat_result):
+        self.path = path
+        self.abs_path = abs_path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.inode = stat.st_ino
+        self.ext = abs_path.suffix.lower() or '(none)'
+        self._digests: dict[str, str] = {}
+
+    def digest(self, algorithm: str = 'sha256') -> str:
+        """Hex digest of the file contents, computed on first use
+
+        The standard digests are computed together in one read pass.
+        """
+        if algorithm not in self._digests:
+            algorithms = DIGESTS if algorithm in DIGESTS else (algorithm,)
+            self._digests.update(hash_file(self.abs_path, algorithms))
+        return self._digests[algorithm]
+
+    def cached(self, key: str, compute) -> str:
+        """Memoize a platform-specific hash alongside the standard digests"""
+        if key not in self._digests:
+            self._digests[key] = compute(self.abs_path)
+        return self._digests[key]
+
+
+class DistManifest:
+    """All files under a dist directory, sorted by relative path"""
+
+    def __init__(self, root: Path, files: list[DistFile]):
+        self.root = root
+        self.files = sorted(files, key=lambda f: f.path)
+        self.by_path = {f.path: f for f in self.files}
+        self.total_size = sum(f.size for f in self.files)
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def get(self, path: str) -> DistFile | None:
+        return self.by_path.get(path)
+
+    def under(self, prefix: str) -> list[DistFile]:
+        """Files inside a subdirectory of dist"""
+        prefix = prefix.rstrip('/') + '/'
+        return [f for f in self.files if f.path.startswith(prefix)]
+
+    def hash_all(self, workers: int | None = None, use_cache: bool = True):
+        """Compute the standard digests for every file in parallel
+
+        Files unchanged since they were last hashed (same path, size,
+        mtime_ns and inode) are served from the persistent checksum cache.
+        """
+        pending = [f for f in self.files if not all(a in f._digests for a in DIGESTS)]
+        if not pending:
+            return
+
+        cache = get_checksum_cache() if use_cache else None
+        misses = []
+        for f in pending:
+            cached = cache.lookup(f.abs_path, f.size, f.mtime_ns, f.inode) if cache else None
+            if cached:
+                f._digests.update(cached)
+            else:
+                misses.append(f)
+
+        results = hash_files([f.abs_path for f in misses], DIGESTS, workers)
+        for f, digests in zip(misses, results):
+            f._digests.update(digests)
+
+        if cache:
+            cache.store([(f.abs_path, f.size, f.mtime_ns, f.inode, f._digests) for f in misses])
+            cache.prune(self.root, {str(f.abs_path) for f in self.files})
+
+    def fingerprint(self) -> str:
+        """Cheap identity of the tree from paths, sizes and mtimes"""
+        h = hashlib.sha256()
+        for f in self.files:
+            h.update(f"{f.path}\0{f.size}\0{f.mtime_ns}\n".encode())
+        return h.hexdigest()
+
+
+def scan_dist(dist_dir: Path = DIST_DIR) -> DistManifest:
+    """Walk dist with os.scandir, reusing each entry's stat data"""
+    files = []
+    stack = [(dist_dir, '')]
+
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((Path(entry.path), f"{prefix}{entry.name}/"))
+                    elif entry.is_file():
+                        files.append(DistFile(f"{prefix}{entry.name}", Path(entry.path), entry.stat()))
+        except FileNotFoundError:
+            continue
+
+    return DistManifest(dist_dir, files)
+
+
+_manifests: dict[str, DistManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_dist_manifest(dist_dir: Path = DIST_DIR, refresh: bool = False) -> DistManifest:
+    """Return the manifest for dist, scanning it only once per process"""
+    key = str(dist_dir)
+    with _manifests_lock:
+        if refresh or key not in _manifests:
+            _manifests[key] = scan_dist(dist_dir)
+        return _manifests[key]
+
+
+def invalidate_dist_manifest(dist_dir: Path = DIST_DIR):
+    """Drop the cached manifest after anything writes to dist"""
+    with _manifests_lock:
+        _manifests.pop(str(dist_dir), None)
@@ -1,5 +1,4 @@
 import sys
-import requests
 from pathlib import Path
 
 # Force UTF-8 output
@@ -9,7 +8,8 @@ if sys.platform == 'win32':
 
 sys.path.insert(0, str(Path(__file__).parent))
 from dns_cloudflare import list_dns_records, get_zone_id
-from config import DOMAIN
+from config import DOMAIN, MIRRORS, PROBE_SAMPLES
+from http_probe import probe_mirrors
 
 def final_check():
     print(f"--- FINAL HEALTH CHECK FOR {DOMAIN} ---")
@@ -26,21 +26,36 @@ def final_check():
             print(f"{r.get('type'):6} {name:30} -> {r.get('content')}")
 
     # 2. HTTP Check
-    urls = {
-        "Main Site (Cloudflare)": f"https://about.{DOMAIN}",
-        "Netlify": "https://chirag127.netlify.app",
-        "Vercel": "https://chirag127-6r7f25peu-whyiswhengmailcoms-projects.vercel.app",
-        "Surge": "https://chirag127.surge.sh",
-        "Neocities": "https://chirag127.neocities.org"
-    }
-
-    print("\n[HTTP REACHABILITY]")
-    for label, url in urls.items():
-        try:
-            resp = requests.get(url, timeout=10)
-            print(f"{label:22}: {resp.status_code} {resp.reason} ({url})")
-        except Exception as e:
-            print(f"{label:22}: FAILED - {e}")
+    check_http()
+
+
+def check_http(samples: int = PROBE_SAMPLES, mirrors: dict = MIRRORS) -> dict:
+    """Probe every mirror concurrently and return {label: reachable}
+
+    Each mirror gets `samples` GETs over one kept-alive connection; total,
+    TTFB and transfer time are each reported at p50/p95/p99. A mirror is
+    reachable when most samples succeed without an error status.
+    """
+    print(f"\n[HTTP REACHABILITY] {samples} samples per mirror")
+    print(f"{'':22}  {'':>6} {'total':^23} {'ttfb':^23} {'xfer':^23}")
+    print(f"{'':22}  {'status':>6}" + f" {'p50':>7} {'p95':>7} {'p99':>7}" * 3)
+
+    def ms(seconds):
+        return f"{seconds * 1000:.0f}ms" if seconds is not None else "—"
+
+    def row(stats, prefix):
+        return ''.join(f" {ms(stats[prefix + p]):>7}" for p in ('p50', 'p95', 'p99'))
+
+    results = {}
+    for label, stats in probe_mirrors(mirrors, samples).items():
+        if stats['status'] is None:
+            print(f"{label:22}: FAILED - {stats['last_error']} ({mirrors[label]['url']})")
+        else:
+            errors = f"  {stats['errors']}/{stats['samples']} failed: {stats['last_error']}" if stats['errors'] else ""
+            print(f"{label:22}: {stats['status']:>6}{row(stats, '')}{row(stats, 'ttfb_')}"
+                  f"{row(stats, 'transfer_')}{errors}")
+        results[label] = stats['ok']
+    return results
 
 if __name__ == "__main__":
     final_check()
@@ -0,0 +1,240 @@
+"""
+HTTP health probes for Oriz
+Samples every mirror concurrently with asyncio, each over one kept-alive
+HTTP/1.1 connection, and reports latency percentiles with time to first
+byte and body transfer split out. Standard library only.
+"""
+
+import asyncio
+import math
+import ssl
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urljoin, urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import MIRRORS, PROBE_SAMPLES
+
+MAX_REDIRECTS = 5
+USER_AGENT = 'oriz-probe/1.0'
+
+
+class Sample(NamedTuple):
+    status: int | None      # final status after redirects, None on error
+    ttfb: float | None      # request sent → first response byte (s)
+    total: float | None     # request sent → body fully read (s)
+    size: int               # body bytes (as sent, i.e. compressed)
+    error: str | None
+
+
+class _Connection:
+    """One HTTP/1.1 connection to an origin, reopened when the server closes it"""
+
+    def __init__(self, scheme: str, host: str, port: int):
+        self.scheme, self.host, self.port = scheme, host, port
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def _open(self):
+        context = ssl.create_default_context() if self.scheme == 'https' else None
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port, ssl=context, server_hostname=self.host if context else None,
+        )
+
+    async def request(self, target: str) -> tuple[int, dict, int, float, float]:
+        """GET target; returns (status, headers, body bytes, ttfb, total)
+
+        A kept-alive connection the server has since closed is reopened
+        and the request retried once.
+        """
+        if self._writer is None:
+            await self._open()
+            return await self._exchange(target)
+        try:
+            return await self._exchange(target)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            await self._open()
+            return await self._exchange(target)
+
+    async def _exchange(self, target: str) -> tuple[int, dict, int, float, float]:
+        default_port = 443 if self.scheme == 'https' else 80
+        host = self.host if self.port == default_port else f"{self.host}:{self.port}"
+        self._writer.write(
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            f"Accept: */*\r\n"
+            f"Accept-Encoding: gzip, br\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode('latin-1')
+        )
+        started = time.perf_counter()
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        ttfb = time.perf_counter() - started
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        version, status, *_ = status_line.decode('latin-1').split(' ', 2)
+        status = int(status)
+
+        headers = {}
+        while (line := await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        size = await self._read_body(headers, status)
+        total = time.perf_counter() - started
+
+        if headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0' \
+                or ('content-length' not in headers and 'chunked' not in headers.get('transfer-encoding', '')
+                    and status not in (204, 304)):
+            await self.close()
+        return status, headers, size, ttfb, total
+
+    async def _read_body(self, headers: dict, status: int) -> int:
+        if status in (204, 304) or 100 <= status < 200:
+            return 0
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            size = 0
+            while True:
+                chunk_size = int((await self._reader.readline()).split(b';')[0], 16)
+                if chunk_size == 0:
+                    while (await self._reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass  # trailers
+                    return size
+                await self._reader.readexactly(chunk_size + 2)
+                size += chunk_size
+        if 'content-length' in headers:
+            length = int(headers['content-length'])
+            await self._reader.readexactly(length)
+            return length
+        # Delimited by the server closing the connection
+        size = 0
+        while data := await self._reader.read(65536):
+            size += len(data)
+        return size
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+        self._reader = self._writer = None
+
+
+async def _fetch(url: str, connections: dict) -> Sample:
+    """One sample of url, following redirects; connections are reused per origin"""
+    ttfb = total = 0.0
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        origin = (parts.scheme, parts.hostname, port)
+        if origin not in connections:
+            connections[origin] = _Connection(*origin)
+
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        status, headers, size, hop_ttfb, hop_total = await connections[origin].request(target)
+        # Redirect hops count towards first byte, as a browser would see it
+        ttfb, total = total + hop_ttfb, total + hop_total
+
+        if status in (301, 302, 303, 307, 308) and 'location' in headers:
+            url = urljoin(url, headers['location'])
+            continue
+        return Sample(status, ttfb, total, size, None)
+    return Sample(None, None, None, 0, f"more than {MAX_REDIRECTS} redirects")
+
+
+async def probe_url(url: str, samples: int = PROBE_SAMPLES, timeout: float = 10) -> list[Sample]:
+    """Take samples of url one after another; timeout applies to each sample"""
+    connections: dict = {}
+    results = []
+    try:
+        for _ in range(samples):
+            try:
+                results.append(await asyncio.wait_for(_fetch(url, connections), timeout))
+            except asyncio.TimeoutError:
+                results.append(Sample(None, None, None, 0, f"timed out after {timeout}s"))
+            except (OSError, ssl.SSLError, ValueError, asyncio.IncompleteReadError) as e:
+                results.append(Sample(None, None, None, 0, f"{type(e).__name__}: {e}"))
+            else:
+                continue
+            # The connection is in an unknown state after a failure
+            for connection in connections.values():
+                await connection.close()
+            connections.clear()
+    finally:
+        for connection in connections.values():
+            await connection.close()
+    return results
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """Nearest-rank percentile (p in 0..100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * p / 100))
+    return ordered[rank - 1]
+
+
+def summarize(samples: list[Sample]) -> dict:
+    """Percentiles and error counts for one URL's samples
+
+    A URL is ok when most samples succeed and none returns an error status.
+    """
+    good = [s for s in samples if s.error is None]
+    totals = [s.total for s in good]
+    ttfbs = [s.ttfb for s in good]
+    transfers = [s.total - s.ttfb for s in good]
+    statuses = [s.status for s in good]
+    return {
+        'samples': len(samples),
+        'errors': len(samples) - len(good),
+        'last_error': next((s.error for s in reversed(samples) if s.error), None),
+        'status': statuses[-1] if statuses else None,
+        'ok': len(good) * 2 > len(samples) and all(status < 400 for status in statuses),
+        'bytes': good[-1].size if good else 0,
+        'p50': percentile(totals, 50),
+        'p95': percentile(totals, 95),
+        'p99': percentile(totals, 99),
+        'ttfb_p50': percentile(ttfbs, 50),
+        'ttfb_p95': percentile(ttfbs, 95),
+        'ttfb_p99': percentile(ttfbs, 99),
+        'transfer_p50': percentile(transfers, 50),
+        'transfer_p95': percentile(transfers, 95),
+        'transfer_p99': percentile(transfers, 99),
+    }
+
+
+async def _probe_all(mirrors: dict, samples: int) -> dict:
+    labels = list(mirrors)
+    results = await asyncio.gather(*(
+        probe_url(mirrors[label]['url'], samples, mirrors[label].get('timeout', 10))
+        for label in labels
+    ))
+    return {label: summarize(result) for label, result in zip(labels, results)}
+
+
+def probe_mirrors(mirrors: dict = MIRRORS, samples: int = PROBE_SAMPLES) -> dict:
+    """Probe every mirror concurrently; returns {label: summarize() dict}"""
+    return asyncio.run(_probe_all(mirrors, samples))
+
+
+if __name__ == '__main__':
+    from final_check import check_http
+
+    args = sys.argv[1:]
+    samples = PROBE_SAMPLES
+    if '--samples' in args:
+        i = args.index('--samples')
+        samples = int(args[i + 1])
+        del args[i:i + 2]
+
+    mirrors = {url: {'url': url, 'timeout': 10} for url in args} or MIRRORS
+    results = check_http(samples, mirrors)
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,305 @@
+"""
+Mail outbox for Oriz
+Messages are queued in a local SQLite outbox and sent by a background
+thread over one reused, authenticated SMTP connection. Failed sends are
+retried with exponential backoff, and anything still queued at exit is
+sent on the next run (or with --drain).
+"""
+
+import random
+import smtplib
+import sqlite3
+import sys
+import threading
+import time
+from email import message_from_bytes, policy
+from email.message import Message
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR, SMTP
+
+OUTBOX_FILE = CACHE_DIR / 'outbox.sqlite'
+
+MAX_ATTEMPTS = 8
+RETRY_BASE = 30          # seconds before the first retry, doubled each time
+RETRY_MAX = 3600
+CLAIM_LEASE = 300        # a claimed message is invisible to other senders this long
+
+
+def smtp_configured() -> bool:
+    return bool(SMTP['host'])
+
+
+class Outbox:
+    """Durable message queue; safe to share between threads and processes"""
+
+    def __init__(self, db_path: Path = OUTBOX_FILE):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._lock = threading.Lock()
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created REAL NOT NULL,
+                recipients TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body BLOB NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                last_error TEXT,
+                sent REAL
+            )"""
+        )
+
+    def enqueue(self, message: Message) -> int:
+        """Store a message for sending; returns its outbox id"""
+        recipients = ', '.join(message.get_all('To', []) + message.get_all('Cc', []))
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO messages (created, recipients, subject, body, next_attempt) VALUES (?, ?, ?, ?, ?)",
+                (now, recipients, message.get('Subject', ''), message.as_bytes(), now),
+            )
+            return cursor.lastrowid
+
+    def claim(self, limit: int = 50) -> list[tuple[int, int, bytes]]:
+        """Take up to limit due messages as (id, attempts, body), leasing them to this sender"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, attempts, body FROM messages "
+                    "WHERE sent IS NULL AND attempts < ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                    (MAX_ATTEMPTS, now, limit),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE messages SET next_attempt = ? WHERE id = ?",
+                    [(now + CLAIM_LEASE, row[0]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def mark_sent(self, message_id: int):
+        with self._lock:
+            self._db.execute("UPDATE messages SET sent = ?, last_error = NULL WHERE id = ?", (time.time(), message_id))
+
+    def mark_failed(self, message_id: int, attempts: int, error: str):
+        """Record a failure and schedule the retry with jittered exponential backoff"""
+        delay = min(RETRY_BASE * 2 ** attempts, RETRY_MAX) * random.uniform(0.8, 1.2)
+        with self._lock:
+            self._db.execute(
+                "UPDATE messages SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                (attempts + 1, time.time() + delay, error[:500], message_id),
+            )
+
+    def next_due(self) -> float | None:
+        """When the next pending message becomes due, or None if nothing is pending"""
+        with self._lock:
+            (due,) = self._db.execute(
+                "SELECT MIN(next_attempt) FROM messages WHERE sent IS NULL AND attempts < ?",
+                (MAX_ATTEMPTS,),
+            ).fetchone()
+        return due
+
+    def status(self) -> dict:
+        """Counts of pending, sent and dead (out of retries) messages"""
+        with self._lock:
+            pending, sent, dead = self._db.execute(
+                "SELECT "
+                "SUM(sent IS NULL AND attempts < ?), "
+                "SUM(sent IS NOT NULL), "
+                "SUM(sent IS NULL AND attempts >= ?) FROM messages",
+                (MAX_ATTEMPTS, MAX_ATTEMPTS),
+            ).fetchone()
+        return {'pending': pending or 0, 'sent': sent or 0, 'dead': dead or 0}
+
+
+class SMTPConnection:
+    """One lazily opened, authenticated SMTP session reused for many messages"""
+
+    def __init__(self, settings: dict = SMTP, timeout: int = 30):
+        self._settings = settings
+        self._timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        s = self._settings
+        if s['security'] == 'ssl':
+            smtp = smtplib.SMTP_SSL(s['host'], s['port'], timeout=self._timeout)
+        else:
+            smtp = smtplib.SMTP(s['host'], s['port'], timeout=self._timeout)
+            if s['security'] == 'starttls':
+                smtp.starttls()
+        if s['username']:
+            smtp.login(s['username'], s['password'] or '')
+        return smtp
+
+    def send(self, message: Message):
+        """Send over the open session, reconnecting once if the server dropped it"""
+        if 'From' not in message:
+            message['From'] = self._settings['from']
+
+        for attempt in (1, 2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+def drain(outbox: Outbox, connection: SMTPConnection) -> tuple[int, int]:
+    """Send every due message; returns (sent, failed)"""
+    sent = failed = 0
+    while batch := outbox.claim():
+        for message_id, attempts, body in batch:
+            try:
+                connection.send(message_from_bytes(body, policy=policy.SMTP))
+                outbox.mark_sent(message_id)
+                sent += 1
+            except (smtplib.SMTPException, OSError) as e:
+                outbox.mark_failed(message_id, attempts, f"{type(e).__name__}: {e}")
+                connection.close()
+                failed += 1
+    return sent, failed
+
+
+class BackgroundSender:
+    """Drains the outbox on a daemon thread, waiting out retry backoff
+
+    The thread exits once the outbox is empty, or when stop() is called;
+    messages still waiting on a retry stay queued for the next run.
+    """
+
+    def __init__(self, outbox: Outbox, settings: dict = SMTP):
+        self._outbox = outbox
+        self._connection = SMTPConnection(settings)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+        self.sent = 0
+        self.failed = 0
+        self.done = False
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """Check the outbox again now (after an enqueue)"""
+        self._wake.set()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                sent, failed = drain(self._outbox, self._connection)
+                self.sent += sent
+                self.failed += failed
+
+                due = self._outbox.next_due()
+                if due is None:
+                    # Decide to exit under the lock queue_message() checks, so
+                    # a message queued meanwhile either gets seen here or
+                    # starts a new sender
+                    with _sender_lock:
+                        if self._outbox.next_due() is None:
+                            self.done = True
+                            break
+                    continue
+                self._wake.wait(max(0.0, due - time.time()))
+        finally:
+            self._connection.close()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self, timeout: float | None = None):
+        """Ask the sender to finish and wait up to timeout seconds for it"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait for the outbox to empty; True if the sender finished in time"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+
+_outbox: Outbox | None = None
+_sender: BackgroundSender | None = None
+_sender_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Return the process-wide outbox"""
+    global _outbox
+    with _sender_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
+
+
+def queue_message(message: Message) -> int:
+    """Queue a message and make sure a background sender is running
+
+    Returns immediately; the send happens on the sender thread.
+    """
+    global _sender
+    outbox = get_outbox()
+    message_id = outbox.enqueue(message)
+
+    if smtp_configured():
+        with _sender_lock:
+            if _sender is None or _sender.done or not _sender.is_alive():
+                _sender = BackgroundSender(outbox).start()
+            else:
+                _sender.wake()
+    return message_id
+
+
+def wait_for_outbox(timeout: float = 30) -> bool:
+    """Give the background sender up to timeout seconds to finish (call at exit)"""
+    with _sender_lock:
+        sender = _sender
+    if sender is None:
+        return True
+    if sender.join(timeout):
+        return True
+    sender.stop(timeout=1)
+    return False
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    outbox = get_outbox()
+
+    if '--drain' in args:
+        if not smtp_configured():
+            print("❌ SMTP_HOST is not set")
+            sys.exit(1)
+        connection = SMTPConnection()
+        try:
+            sent, failed = drain(outbox, connection)
+        finally:
+            connection.close()
+        print(f"📤 Sent {sent}, failed {failed}")
+
+    status = outbox.status()
+    print(f"📬 Outbox: {status['pending']} pending, {status['sent']} sent, {status['dead']} out of retries")
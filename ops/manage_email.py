@@ -4,232 +4,565 @@ Handles email notifications via Cloudflare Email Routing and SMTP
 Sends deployment reports, alerts, and notifications to chiragsinghal127@gmail.com
 """
 
-import smtplib
+import json
+import random
 import requests
+import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from email.mime.application import MIMEApplication
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
-from config import CLOUDFLARE, EMAIL, DOMAIN
+from config import (
+    CLOUDFLARE, EMAIL, DOMAIN, SMTP, CACHE_DIR, PROJECT_ROOT,
+    EMAIL_ROUTING_CACHE_TTL, EMAIL_VERIFY_TIMEOUT,
+)
+from mail_outbox import queue_message, smtp_configured, wait_for_outbox
+from notify_digest import add_run, flush, flush_due, held_runs, claim_flush_schedule, summarize
 
 
 NOTIFICATION_EMAIL = 'chiragsinghal127@gmail.com'
+CF_API = 'https://api.cloudflare.com/client/v4'
 
+# Addresses that get an explicit rule on top of the catch-all
+ROUTING_ALIASES = ['hello', 'contact', 'info', 'support', 'admin']
+ROUTING_WORKERS = 8
+ROUTING_PER_PAGE = 50   # the most Cloudflare returns per page for these endpoints
+ROUTING_CACHE = CACHE_DIR / 'email_routing.json'
+ZONE_ID_TTL = 86400
+VERIFY_POLL_START = 5    # seconds between verification checks, doubled up to
+VERIFY_POLL_MAX = 60
 
-def setup_email_routing():
-    """Set up Cloudflare Email Routing for oriz.in → chiragsinghal127@gmail.com"""
-    print("\n📧 Setting up Cloudflare Email Routing...")
+
+def desired_routing_rules(verified: set[str] | None = None) -> list[dict]:
+    """Routing rules oriz.in should have: a catch-all plus one per alias
+
+    With verified (lowercased destination emails), a rule forwarding to an
+    unverified address is kept disabled, since it would drop mail anyway.
+    """
+    forward = [{'type': 'forward', 'value': [NOTIFICATION_EMAIL]}]
+    enabled = verified is None or NOTIFICATION_EMAIL.lower() in verified
+
+    rules = [{
+        'name': f'Catch-all to {NOTIFICATION_EMAIL}',
+        'enabled': enabled,
+        'matchers': [{'type': 'all'}],
+        'actions': forward,
+    }]
+    for addr in ROUTING_ALIASES:
+        rules.append({
+            'name': f'{addr}@{DOMAIN} → {NOTIFICATION_EMAIL}',
+            'enabled': enabled,
+            'matchers': [{'type': 'literal', 'field': 'to', 'value': f'{addr}@{DOMAIN}'}],
+            'actions': forward,
+        })
+    return rules
+
+
+def _rule_key(rule: dict) -> str:
+    """Identify a rule by what it matches: '*' for the catch-all, else the addresses"""
+    matchers = rule.get('matchers', [])
+    if any(m.get('type') == 'all' for m in matchers):
+        return '*'
+    return ','.join(sorted(m.get('value', '').lower() for m in matchers if m.get('type') == 'literal'))
+
+
+def _rule_fields(rule: dict) -> tuple:
+    """The parts of a rule the reconciler manages, normalised for comparison"""
+    return (
+        rule.get('name', ''),
+        bool(rule.get('enabled')),
+        sorted((m.get('type', ''), m.get('field', ''), m.get('value', '')) for m in rule.get('matchers', [])),
+        sorted((a.get('type', ''), sorted(a.get('value', []))) for a in rule.get('actions', [])),
+    )
+
+
+def plan_routing(existing: list[dict], destinations: list[dict], desired: list[dict]) -> list[tuple]:
+    """Diff the live rules and destinations against the desired rules
+
+    Returns operations: ('destination', email), ('create', rule),
+    ('update', rule_id, rule), ('catch_all', rule) and ('delete', rule_id,
+    name). Rules for addresses we don't manage are left alone; only
+    duplicates of managed rules are deleted.
+    """
+    ops = []
+
+    known = {d.get('email', '').lower() for d in destinations}
+    wanted = {email for rule in desired for a in rule['actions'] for email in a.get('value', [])}
+    for email in sorted(wanted):
+        if email.lower() not in known:
+            ops.append(('destination', email))
+
+    by_key: dict[str, list[dict]] = {}
+    for rule in existing:
+        by_key.setdefault(_rule_key(rule), []).append(rule)
+
+    for rule in desired:
+        key = _rule_key(rule)
+        matches = by_key.get(key, [])
+        # Keep a rule that already matches if there is one, else the first
+        keep = next((r for r in matches if _rule_fields(r) == _rule_fields(rule)), matches[0] if matches else None)
+
+        if keep is None:
+            ops.append(('catch_all', rule) if key == '*' else ('create', rule))
+        elif _rule_fields(keep) != _rule_fields(rule):
+            ops.append(('catch_all', rule) if key == '*' else ('update', keep['id'], rule))
+
+        if key != '*':
+            for duplicate in matches:
+                if duplicate is not keep:
+                    ops.append(('delete', duplicate['id'], duplicate.get('name', key)))
+
+    return ops
+
+
+def _apply_routing_op(zone_id: str, op: tuple) -> bool:
+    """Run one reconciler operation against the Cloudflare API"""
+    rules_url = f"{CF_API}/zones/{zone_id}/email/routing/rules"
+    kind = op[0]
+
+    if kind == 'destination':
+        result = _cf_request('POST', f"{CF_API}/accounts/{CLOUDFLARE['account_id']}/email/routing/addresses",
+                             {'email': op[1]})
+        label = f"destination {op[1]} (check the inbox for a verification email)"
+    elif kind == 'create':
+        result = _cf_request('POST', rules_url, op[1])
+        label = f"create {op[1]['name']}"
+    elif kind == 'update':
+        result = _cf_request('PUT', f"{rules_url}/{op[1]}", op[2])
+        label = f"update {op[2]['name']}"
+    elif kind == 'catch_all':
+        result = _cf_request('PUT', f"{rules_url}/catch_all", op[1])
+        label = f"catch-all *@{DOMAIN}"
+    else:
+        result = _cf_request('DELETE', f"{rules_url}/{op[1]}")
+        label = f"delete duplicate {op[2]}"
+
+    if result.get('success'):
+        print(f"   ✅ {label}")
+        return True
+    print(f"   ❌ {label}: {result.get('errors', [])}")
+    return False
+
+
+def setup_email_routing(refresh: bool = False, wait: float = EMAIL_VERIFY_TIMEOUT):
+    """Reconcile Cloudflare Email Routing for oriz.in → chiragsinghal127@gmail.com
+
+    Lists the current rules (from the routing cache when it is fresh) and
+    destinations (always fetched) in parallel, and applies only the changes
+    needed, so a run with nothing to change makes no writes at all.
+    refresh=True ignores the cache, for when rules were edited in the
+    dashboard.
+
+    Rules stay disabled while their destination is unverified. With wait,
+    verification is polled for up to that many seconds and the rules are
+    enabled as soon as it completes; otherwise a later run enables them.
+    """
+    print("\n📧 Reconciling Cloudflare Email Routing...")
 
     if not CLOUDFLARE['account_id'] or not CLOUDFLARE['api_key']:
         print("❌ Missing Cloudflare credentials")
         return False
 
-    # Step 1: Get zone ID
-    zone_id = _get_zone_id(DOMAIN)
+    zone_id = _resolve_zone_id()
     if not zone_id:
         print(f"❌ Could not find zone for {DOMAIN}")
         return False
 
-    # Step 2: Enable Email Routing
-    enable_url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/email/routing/enable"
-    headers = _get_cf_headers()
-
-    try:
-        response = requests.post(enable_url, headers=headers, json={'enabled': True})
-        result = response.json()
-        if result.get('success'):
-            print("   ✅ Email Routing enabled")
-        else:
-            errors = result.get('errors', [])
-            # May already be enabled
-            print(f"   ℹ️ Email Routing: {errors if errors else 'already enabled'}")
-    except Exception as e:
-        print(f"   ⚠️ Could not enable routing: {e}")
+    ok, pending = _reconcile_routing(zone_id, refresh)
+    if not pending:
+        return ok
+
+    print(f"   ⏳ Rules held disabled until verified: {', '.join(sorted(pending))}")
+    if wait <= 0:
+        print("   Click the link in the verification email, then run --setup again (or --setup --wait)")
+        return ok
+
+    still_pending = wait_for_verification(pending, wait)
+    if still_pending:
+        print(f"   ⚠️ Not verified after {wait:.0f}s; rules stay disabled until the next --setup")
+        return ok
+
+    ok2, _ = _reconcile_routing(zone_id, refresh=True)
+    return ok and ok2
+
+
+def _reconcile_routing(zone_id: str, refresh: bool) -> tuple[bool, set[str]]:
+    """One reconcile pass; returns (ok, destination emails still unverified)"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rules_future = executor.submit(_list_rules, zone_id, refresh)
+        # Verification gates rule activation, so never trust a cached copy
+        destinations_future = executor.submit(_list_destinations, True)
+        existing, destinations = rules_future.result(), destinations_future.result()
+
+    if existing is None or destinations is None:
+        print("❌ Could not read current routing state")
+        return False, set()
+
+    verified = _verified_emails(destinations)
+    desired = desired_routing_rules(verified)
+    pending = {
+        email.lower() for rule in desired for a in rule['actions'] for email in a.get('value', [])
+    } - verified
+
+    ops = plan_routing(existing, destinations, desired)
+    if not ops:
+        print(f"   ✅ Already in sync ({len(existing)} rules)")
+        return True, pending
+
+    print(f"   🔧 {len(ops)} changes to apply")
+
+    # Destinations must exist before rules can forward to them; routing
+    # only needs enabling when something is being set up
+    ok = all([_apply_routing_op(zone_id, op) for op in ops if op[0] == 'destination'])
+    rule_ops = [op for op in ops if op[0] != 'destination']
+
+    with ThreadPoolExecutor(max_workers=ROUTING_WORKERS) as executor:
+        enable = executor.submit(_cf_request, 'POST', f"{CF_API}/zones/{zone_id}/email/routing/enable", {'enabled': True})
+        results = list(executor.map(lambda op: _apply_routing_op(zone_id, op), rule_ops))
+
+    if not enable.result().get('success'):
+        print(f"   ℹ️ Email Routing enable: {enable.result().get('errors') or 'already enabled'}")
+
+    invalidate_routing_cache()
+    ok = ok and all(results)
+    print(f"\n{'✅' if ok else '⚠️'} Email routing reconciled")
+    if pending:
+        print(f"   Emails to *@{DOMAIN} will forward to {NOTIFICATION_EMAIL} once it is verified")
+    else:
+        print(f"   All emails to *@{DOMAIN} will forward to {NOTIFICATION_EMAIL}")
+    return ok, pending
 
-    # Step 3: Add destination address
-    dest_url = f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE['account_id']}/email/routing/addresses"
 
-    try:
-        response = requests.post(dest_url, headers=headers, json={
-            'email': NOTIFICATION_EMAIL,
-        })
-        result = response.json()
-        if result.get('success'):
-            print(f"   ✅ Destination added: {NOTIFICATION_EMAIL}")
-            print(f"   ⚠️ Check {NOTIFICATION_EMAIL} for verification email!")
-        else:
-            errors = result.get('errors', [])
-            if any('already exists' in str(e) for e in errors):
-                print(f"   ℹ️ Destination already registered: {NOTIFICATION_EMAIL}")
-            else:
-                print(f"   ⚠️ {errors}")
-    except Exception as e:
-        print(f"   ❌ Error adding destination: {e}")
-
-    # Step 4: Create catch-all rule (forward all @oriz.in to notification email)
-    rules_url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/email/routing/rules"
-
-    catch_all_rule = {
-        'actions': [
-            {
-                'type': 'forward',
-                'value': [NOTIFICATION_EMAIL],
-            }
-        ],
-        'matchers': [
-            {
-                'type': 'all',
-            }
-        ],
-        'enabled': True,
-        'name': 'Catch-all to chiragsinghal127@gmail.com',
-    }
+def _verified_emails(destinations: list[dict]) -> set[str]:
+    """Lowercased emails of the destinations Cloudflare reports as verified"""
+    return {d.get('email', '').lower() for d in destinations if d.get('verified')}
 
-    try:
-        response = requests.post(rules_url, headers=headers, json=catch_all_rule)
-        result = response.json()
-        if result.get('success'):
-            print(f"   ✅ Catch-all rule created: *@{DOMAIN} → {NOTIFICATION_EMAIL}")
-        else:
-            errors = result.get('errors', [])
-            if any('already exists' in str(e) for e in errors):
-                print(f"   ℹ️ Catch-all rule already exists")
-            else:
-                print(f"   ⚠️ {errors}")
-    except Exception as e:
-        print(f"   ❌ Error creating rule: {e}")
-
-    # Step 5: Create specific routing rules for common addresses
-    specific_addresses = ['hello', 'contact', 'info', 'support', 'admin']
-
-    for addr in specific_addresses:
-        rule = {
-            'actions': [
-                {
-                    'type': 'forward',
-                    'value': [NOTIFICATION_EMAIL],
-                }
-            ],
-            'matchers': [
-                {
-                    'type': 'literal',
-                    'field': 'to',
-                    'value': f'{addr}@{DOMAIN}',
-                }
-            ],
-            'enabled': True,
-            'name': f'{addr}@{DOMAIN} → {NOTIFICATION_EMAIL}',
-        }
 
-        try:
-            response = requests.post(rules_url, headers=headers, json=rule)
-            result = response.json()
-            if result.get('success'):
-                print(f"   ✅ {addr}@{DOMAIN} → {NOTIFICATION_EMAIL}")
-            else:
-                errors = result.get('errors', [])
-                if any('already exists' in str(e) for e in errors):
-                    print(f"   ℹ️ Rule already exists: {addr}@{DOMAIN}")
-                else:
-                    print(f"   ⚠️ {addr}@{DOMAIN}: {errors}")
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
-
-    print(f"\n✅ Email routing setup complete!")
-    print(f"   All emails to *@{DOMAIN} will forward to {NOTIFICATION_EMAIL}")
-    return True
+def wait_for_verification(emails: set[str], timeout: float,
+                          initial_delay: float = VERIFY_POLL_START,
+                          max_delay: float = VERIFY_POLL_MAX) -> set[str]:
+    """Poll until every destination in emails is verified or timeout passes
 
+    Each check is one (paginated) listing of all destinations, so any
+    number of addresses costs the same. The delay between checks doubles,
+    with jitter, up to max_delay. Returns the emails still unverified.
+    """
+    pending = {e.lower() for e in emails}
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+
+    print(f"   ⏳ Waiting up to {timeout:.0f}s for verification of {', '.join(sorted(pending))}")
+    while True:
+        destinations = _list_destinations(refresh=True)
+        if destinations is not None:
+            newly = pending & _verified_emails(destinations)
+            for email in sorted(newly):
+                print(f"   ✅ {email} verified")
+            pending -= newly
+        if not pending:
+            return pending
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return pending
+        time.sleep(min(delay * random.uniform(0.8, 1.2), remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def list_email_routes(refresh: bool = False):
+    """List configured email routing rules (all pages)"""
+    zone_id = _resolve_zone_id()
+    rules = _list_rules(zone_id, refresh) if zone_id else None
 
-def list_email_routes():
-    """List configured email routing rules"""
     print(f"\n📧 Email Routing Rules for {DOMAIN}")
     print("=" * 60)
+    if rules is None:
+        return []
 
-    zone_id = _get_zone_id(DOMAIN)
-    if not zone_id:
+    print(f"\n  📋 {len(rules)} routing rules:")
+    for rule in rules:
+        enabled = "✅" if rule.get('enabled') else "⛔"
+        name = rule.get('name', 'Unnamed')
+        actions = rule.get('actions', [])
+        targets = ', '.join(
+            ', '.join(a.get('value', []))
+            for a in actions if a.get('type') == 'forward'
+        )
+        print(f"    {enabled} {name}")
+        if targets:
+            print(f"       → {targets}")
+    return rules
+
+
+def list_destination_addresses(refresh: bool = False):
+    """List destination email addresses and whether each is verified (all pages)"""
+    addresses = _list_destinations(refresh)
+
+    print(f"\n📧 Destination Addresses")
+    print("=" * 60)
+    if addresses is None:
         return []
 
-    url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}/email/routing/rules"
+    for addr in addresses:
+        verified = "✅" if addr.get('verified') else "⏳"
+        print(f"  {verified} {addr.get('email', 'Unknown')}")
+    return addresses
 
-    try:
-        response = requests.get(url, headers=_get_cf_headers())
-        result = response.json()
 
-        if result.get('success'):
-            rules = result.get('result', [])
-            print(f"\n  📋 {len(rules)} routing rules:")
-            for rule in rules:
-                enabled = "✅" if rule.get('enabled') else "⛔"
-                name = rule.get('name', 'Unnamed')
-                actions = rule.get('actions', [])
-                targets = ', '.join(
-                    ', '.join(a.get('value', []))
-                    for a in actions if a.get('type') == 'forward'
-                )
-                print(f"    {enabled} {name}")
-                if targets:
-                    print(f"       → {targets}")
-            return rules
-        else:
-            print(f"  ❌ Error: {result.get('errors', [])}")
-            return []
-    except Exception as e:
-        print(f"  ❌ API error: {e}")
-        return []
+def iter_routing_rules(zone_id: str) -> Iterator[dict]:
+    """Yield every routing rule for the zone, page by page"""
+    return _iter_pages(f"{CF_API}/zones/{zone_id}/email/routing/rules")
 
 
-def list_destination_addresses():
-    """List verified destination email addresses"""
-    print(f"\n📧 Destination Addresses")
-    print("=" * 60)
+def iter_destination_addresses() -> Iterator[dict]:
+    """Yield every destination address on the account, page by page"""
+    return _iter_pages(f"{CF_API}/accounts/{CLOUDFLARE['account_id']}/email/routing/addresses")
+
+
+def _iter_pages(url: str, per_page: int = ROUTING_PER_PAGE) -> Iterator[dict]:
+    """Yield the items of a paginated Cloudflare list endpoint in order
+
+    The first page says how many pages there are; the rest are fetched
+    concurrently. Raises RuntimeError if any page fails.
+    """
+    def fetch(page: int) -> dict:
+        result = _cf_request('GET', f"{url}?page={page}&per_page={per_page}")
+        if not result.get('success'):
+            raise RuntimeError(result.get('errors', []))
+        return result
+
+    first = fetch(1)
+    yield from first.get('result') or []
 
-    url = f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE['account_id']}/email/routing/addresses"
+    info = first.get('result_info') or {}
+    total_pages = info.get('total_pages')
+    if total_pages is None and info.get('total_count') is not None:
+        total_pages = -(-info['total_count'] // per_page)
 
+    if total_pages is None:
+        # No page count reported: keep going until a short page
+        page, items = 1, first.get('result') or []
+        while len(items) >= per_page:
+            page += 1
+            items = fetch(page).get('result') or []
+            yield from items
+    elif total_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(ROUTING_WORKERS, total_pages - 1)) as executor:
+            for result in executor.map(fetch, range(2, total_pages + 1)):
+                yield from result.get('result') or []
+
+
+_cache_lock = threading.Lock()
+
+
+def _load_routing_cache() -> dict:
     try:
-        response = requests.get(url, headers=_get_cf_headers())
-        result = response.json()
+        return json.loads(ROUTING_CACHE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
 
-        if result.get('success'):
-            addresses = result.get('result', [])
-            for addr in addresses:
-                verified = "✅" if addr.get('verified') else "⏳"
-                print(f"  {verified} {addr.get('email', 'Unknown')}")
-            return addresses
-        else:
-            print(f"  ❌ Error: {result.get('errors', [])}")
-            return []
+
+def _save_routing_cache(cache: dict):
+    """Write the cache atomically so a concurrent reader never sees half a file"""
+    ROUTING_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ROUTING_CACHE.with_suffix('.tmp')
+    tmp.write_text(json.dumps(cache), encoding='utf-8')
+    tmp.replace(ROUTING_CACHE)
+
+
+def _cached(key: str, fetch, ttl: float = EMAIL_ROUTING_CACHE_TTL, refresh: bool = False):
+    """Return fetch() via the routing cache, refetching once ttl seconds old
+
+    fetch returning None (an error) is not cached.
+    """
+    now = time.time()
+    if not refresh and ttl > 0:
+        with _cache_lock:
+            entry = _load_routing_cache().get(key)
+        if entry and now - entry['time'] < ttl:
+            return entry['value']
+
+    value = fetch()
+    if value is not None:
+        with _cache_lock:
+            cache = _load_routing_cache()
+            cache[key] = {'time': now, 'value': value}
+            _save_routing_cache(cache)
+    return value
+
+
+def invalidate_routing_cache():
+    """Forget cached rules and destinations (after changing them); zone IDs are kept"""
+    with _cache_lock:
+        cache = _load_routing_cache()
+        kept = {k: v for k, v in cache.items() if k.startswith('zone:')}
+        if kept != cache:
+            _save_routing_cache(kept)
+
+
+def _list_rules(zone_id: str, refresh: bool = False) -> list[dict] | None:
+    """All routing rules for the zone, or None on error"""
+    def fetch():
+        try:
+            return list(iter_routing_rules(zone_id))
+        except RuntimeError as e:
+            print(f"  ❌ Error listing rules: {e}")
+            return None
+    return _cached(f"rules:{zone_id}", fetch, refresh=refresh)
+
+
+def _list_destinations(refresh: bool = False) -> list[dict] | None:
+    """All destination addresses on the account, or None on error"""
+    def fetch():
+        try:
+            return list(iter_destination_addresses())
+        except RuntimeError as e:
+            print(f"  ❌ Error listing destinations: {e}")
+            return None
+    return _cached(f"destinations:{CLOUDFLARE['account_id']}", fetch, refresh=refresh)
+
+
+def _cf_request(method: str, url: str, payload: dict | None = None) -> dict:
+    """Call the Cloudflare API; errors come back as an unsuccessful result"""
+    try:
+        response = requests.request(method, url, headers=_get_cf_headers(), json=payload, timeout=30)
+        return response.json()
     except Exception as e:
-        print(f"  ❌ API error: {e}")
-        return []
+        return {'success': False, 'errors': [str(e)]}
+
+
+def send_deployment_report(results: dict, durations: dict | None = None, immediate: bool = False,
+                           perf: dict | None = None):
+    """Report a deploy run, folding frequent runs into one digest email
+
+    durations maps platform → seconds and perf is the run's deploy_metrics
+    report. With immediate=True the window is ignored and this run is
+    reported on its own.
+    """
+    if immediate:
+        runs = [{'time': time.time(), 'results': results, 'durations': durations or {}, 'perf': perf}]
+    elif not smtp_configured():
+        # Nothing can be sent yet; keep every run held for the first real digest
+        add_run(results, durations, perf=perf, hold=True)
+        runs = held_runs()
+    else:
+        runs = add_run(results, durations, perf=perf)
+
+    if not runs:
+        due = flush_due()
+        print(f"\n📧 Deployment report held for the digest "
+              f"(sent at {datetime.fromtimestamp(due).strftime('%H:%M:%S')} unless something changes first)")
+        _schedule_digest_flush()
+        return True
+
+    return _deliver_report(runs)
+
+
+def flush_report_digest(due: float | None = None):
+    """Send any held deployment reports now (with due, only that window's digest once it has closed)"""
+    runs = flush(due=due) if smtp_configured() else held_runs()
+    if not runs:
+        print("📧 No held reports")
+        return True
+    return _deliver_report(runs)
 
 
-def send_deployment_report(results: dict):
-    """Send deployment summary report via email (using Cloudflare Workers or SMTP)"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def _schedule_digest_flush():
+    """Start a detached process that sends the held digest when its window closes
 
-    subject = f"[Oriz] Deployment Report — {timestamp}"
+    It outlives this run, so held reports go out even if no later deploy
+    happens. One is started per window.
+    """
+    due = claim_flush_schedule()
+    if due is None:
+        return
+    options = {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+    if sys.platform == 'win32':
+        options['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options['start_new_session'] = True
+    try:
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve()), '--flush-when-due', repr(due)], **options)
+    except OSError as e:
+        print(f"   ⚠️ Could not schedule the digest ({e}); run python ops/manage_email.py --flush")
+
+
+def _flush_when_due(due: float):
+    """Send the digest scheduled for due once it is due (run by _schedule_digest_flush)
+
+    Exits early if that digest is sent, or rescheduled, by another run.
+    """
+    while flush_due() == due:
+        if time.time() < due:
+            time.sleep(min(due - time.time(), 60))
+            continue
+        flush_report_digest(due=due)
+        wait_for_outbox(timeout=120)
+        return
+
+
+def render_report(runs: list[dict]) -> tuple[str, str, str, str]:
+    """Render one run, or a digest of several, as (subject, text, html, overall)"""
+    summary = summarize(runs)
+    started = datetime.fromtimestamp(runs[0]['time']).strftime('%Y-%m-%d %H:%M:%S')
+    timestamp = datetime.fromtimestamp(runs[-1]['time']).strftime('%Y-%m-%d %H:%M:%S')
+    digest = len(runs) > 1
+
+    if digest:
+        subject = f"[Oriz] Deployment Digest — {len(runs)} runs, {started} → {timestamp}"
+        when = f"{len(runs)} runs · {started} → {timestamp}"
+    else:
+        subject = f"[Oriz] Deployment Report — {timestamp}"
+        when = timestamp
 
-    # Build HTML report
-    success_count = sum(1 for s in results.values() if s)
-    total = len(results)
+    # Overall status follows each platform's latest run
+    success_count = sum(1 for entry in summary.values() if entry['last'])
+    total = len(summary)
     overall = "✅ SUCCESS" if success_count == total else "⚠️ PARTIAL" if success_count > 0 else "❌ FAILED"
 
+    def status(entry, icons=True):
+        if not digest:
+            return ("✅ Success" if entry['last'] else "❌ Failed") if icons else ("SUCCESS" if entry['last'] else "FAILED")
+        last = ("✅" if entry['last'] else "❌") if icons else ("ok" if entry['last'] else "FAILED")
+        return f"{entry['ok']}/{entry['runs']} ok, last {last}"
+
+    def duration(entry):
+        if entry['avg'] is None:
+            return "—"
+        if digest:
+            return f"{entry['avg']:.1f}s avg, {entry['max']:.1f}s max"
+        return f"{entry['avg']:.1f}s"
+
     rows = []
-    for platform, success in results.items():
-        status = "✅ Success" if success else "❌ Failed"
-        rows.append(f"<tr><td>{platform}</td><td>{status}</td></tr>")
+    for platform, entry in summary.items():
+        rows.append(f"<tr><td>{platform}</td><td>{status(entry)}</td><td>{duration(entry)}</td></tr>")
+
+    perf_lines = _perf_lines(_latest_perf(runs))
+    perf_html = ''
+    if perf_lines:
+        perf_html = (
+            '<h2 style="color: #fff; font-size: 16px; margin-top: 24px;">Performance</h2>'
+            '<ul style="color: #c4c4d4; font-size: 13px; padding-left: 18px;">'
+            + ''.join(f"<li>{line}</li>" for line in perf_lines)
+            + '</ul>'
+        )
 
     html_body = f"""
     <html>
     <body style="font-family: 'Inter', Arial, sans-serif; background: #0a0a12; color: #e4e4ed; padding: 24px;">
         <div style="max-width: 600px; margin: 0 auto; background: #12121e; border-radius: 12px; padding: 32px; border: 1px solid rgba(255,255,255,0.08);">
             <h1 style="font-family: 'Outfit', sans-serif; color: #fff; font-size: 24px; margin-bottom: 8px;">
-                ◈ Oriz Deployment Report
+                ◈ Oriz Deployment {'Digest' if digest else 'Report'}
             </h1>
-            <p style="color: #9090a7; font-size: 14px; margin-bottom: 24px;">{timestamp}</p>
+            <p style="color: #9090a7; font-size: 14px; margin-bottom: 24px;">{when}</p>
 
             <div style="background: rgba(108,99,255,0.08); border-radius: 8px; padding: 16px; margin-bottom: 24px;">
                 <span style="font-size: 18px; font-weight: 600; color: #fff;">{overall}</span>
@@ -241,6 +574,7 @@ def send_deployment_report(results: dict):
                     <tr style="border-bottom: 1px solid rgba(255,255,255,0.08);">
                         <th style="text-align: left; padding: 8px 0; color: #9090a7; font-size: 12px; text-transform: uppercase;">Platform</th>
                         <th style="text-align: left; padding: 8px 0; color: #9090a7; font-size: 12px; text-transform: uppercase;">Status</th>
+                        <th style="text-align: left; padding: 8px 0; color: #9090a7; font-size: 12px; text-transform: uppercase;">Duration</th>
                     </tr>
                 </thead>
                 <tbody>
@@ -248,6 +582,8 @@ def send_deployment_report(results: dict):
                 </tbody>
             </table>
 
+            {perf_html}
+
             <hr style="border: none; border-top: 1px solid rgba(255,255,255,0.08); margin: 24px 0;">
 
             <p style="color: #9090a7; font-size: 12px;">
@@ -259,35 +595,92 @@ def send_deployment_report(results: dict):
     """
 
     text_body = f"""
-Oriz Deployment Report — {timestamp}
+Oriz Deployment {'Digest' if digest else 'Report'} — {when}
 {'=' * 50}
 
 Overall: {overall} ({success_count}/{total} platforms)
 
 """
-    for platform, success in results.items():
-        status = "SUCCESS" if success else "FAILED"
-        text_body += f"  {platform}: {status}\n"
+    for platform, entry in summary.items():
+        text_body += f"  {platform}: {status(entry, icons=False)} ({duration(entry)})\n"
+
+    if perf_lines:
+        text_body += "\nPerformance" + (" (latest run)" if digest else "") + ":\n"
+        text_body += ''.join(f"  {line}\n" for line in perf_lines)
 
     text_body += f"\n—\nOriz · https://oriz.in"
+    return subject, text_body, html_body, overall
+
+
+def _latest_perf(runs: list[dict]) -> dict | None:
+    return next((run['perf'] for run in reversed(runs) if run.get('perf')), None)
+
 
-    # Try to send via available method
-    print(f"\n📧 Sending deployment report to {NOTIFICATION_EMAIL}...")
+def _perf_lines(perf: dict | None) -> list[str]:
+    """Human-readable lines for a deploy_metrics report"""
+    if not perf:
+        return []
+    from deploy_metrics import format_platform
+    from manage_files import format_size
+
+    dist = perf['dist']
+    build = f"{perf['build_seconds']:.1f}s" if perf['build_seconds'] is not None else "reused existing dist"
+    delta = f", {dist['bytes_delta']:+,} B since last run" if dist['bytes_delta'] is not None else ""
+    lines = [
+        f"Build: {build}",
+        f"Dist: {dist['files']} files, {format_size(dist['bytes'])}{delta}",
+    ]
+    for platform, metrics in perf['platforms'].items():
+        lines.append(f"{platform}: {format_platform(metrics)}")
+    return lines
+
+
+def _deliver_report(runs: list[dict]) -> bool:
+    """Render runs and queue the email, or keep a local copy without SMTP"""
+    subject, text_body, html_body, overall = render_report(runs)
+
+    body = MIMEMultipart('alternative')
+    body.attach(MIMEText(text_body, 'plain', 'utf-8'))
+    body.attach(MIMEText(html_body, 'html', 'utf-8'))
+
+    perf = _latest_perf(runs)
+    if perf:
+        # The machine-readable report rides along for anyone charting it
+        message = MIMEMultipart('mixed')
+        message.attach(body)
+        attachment = MIMEApplication(json.dumps(perf, indent=2).encode('utf-8'), 'json')
+        attachment.add_header('Content-Disposition', 'attachment', filename='deploy_report.json')
+        message.attach(attachment)
+    else:
+        message = body
+    message['Subject'] = subject
+    message['From'] = SMTP['from']
+    message['To'] = NOTIFICATION_EMAIL
+
+    print(f"\n📧 Queueing deployment report for {NOTIFICATION_EMAIL}...")
     print(f"   Subject: {subject}")
     print(f"   Status: {overall}")
 
-    # Log the report since SMTP may not be configured
-    report_file = Path(__file__).parent.parent / 'dist' / 'deployment_report.txt'
-    try:
+    if not smtp_configured():
+        # Keep a copy outside dist so it never ships with the site
+        report_file = CACHE_DIR / 'deployment_report.txt'
         report_file.parent.mkdir(parents=True, exist_ok=True)
         report_file.write_text(text_body, encoding='utf-8')
-        print(f"   📄 Report saved to: deployment_report.txt")
-    except Exception:
-        pass
+        print(f"   ⚠️ SMTP_HOST not set — report saved to {report_file.relative_to(PROJECT_ROOT)}, "
+              f"runs held until SMTP is configured")
+        return False
 
+    # Sent on a background thread; deploys don't wait for SMTP
+    message_id = queue_message(message)
+    print(f"   📬 Queued as outbox message #{message_id}")
     return True
 
 
+def _resolve_zone_id() -> str | None:
+    """Zone ID from config, falling back to a (cached) lookup by domain"""
+    return CLOUDFLARE['zone_id'] or _cached(f"zone:{DOMAIN}", lambda: _get_zone_id(DOMAIN), ttl=ZONE_ID_TTL)
+
+
 def _get_zone_id(domain: str) -> str | None:
     """Get Cloudflare zone ID"""
     url = f"https://api.cloudflare.com/client/v4/zones?name={domain}"
@@ -316,28 +709,56 @@ if __name__ == '__main__':
     print("=" * 50)
     print(f"   Notification email: {NOTIFICATION_EMAIL}")
 
+    args = sys.argv[1:]
+
+    if '--flush-when-due' in args:
+        _flush_when_due(float(args[args.index('--flush-when-due') + 1]))
+        sys.exit(0)
+    if '--flush' in args:
+        flush_report_digest()
+        if not wait_for_outbox(timeout=60):
+            print("   ⏳ Still sending — run python ops/mail_outbox.py --drain later")
+        sys.exit(0)
+
     if not CLOUDFLARE['api_key'] or not CLOUDFLARE['email']:
         print("❌ Missing Cloudflare credentials")
         sys.exit(1)
 
-    args = sys.argv[1:]
+    refresh = '--refresh' in args
 
     if '--setup' in args:
-        setup_email_routing()
+        if '--wait' in args:
+            i = args.index('--wait')
+            value = args[i + 1] if i + 1 < len(args) and not args[i + 1].startswith('--') else '600'
+            try:
+                wait = float(value)
+            except ValueError:
+                wait = -1
+            if wait < 0:
+                print(f"❌ --wait expects a number of seconds, got {value!r}")
+                sys.exit(2)
+            setup_email_routing(refresh, wait=wait)
+        else:
+            setup_email_routing(refresh)
     elif '--list-rules' in args:
-        list_email_routes()
+        list_email_routes(refresh)
     elif '--list-destinations' in args:
-        list_destination_addresses()
+        list_destination_addresses(refresh)
     elif '--test' in args:
         send_deployment_report({
             'Cloudflare': True,
             'Netlify': True,
             'Vercel': False,
-        })
+        }, immediate=True)
+        if not wait_for_outbox(timeout=60):
+            print("   ⏳ Still sending — run python ops/mail_outbox.py --drain later")
     else:
         print("\nUsage:")
         print("  python manage_email.py --setup              Set up email routing")
+        print("  python manage_email.py --setup --wait [s]   ...and wait for destination verification (default 600s)")
         print("  python manage_email.py --list-rules         List routing rules")
         print("  python manage_email.py --list-destinations  List destination addresses")
         print("  python manage_email.py --test               Send test deployment report")
+        print("  python manage_email.py --flush              Send held deployment reports now")
+        print("  Add --refresh to --setup/--list-* to bypass the routing cache")
         print(f"\nAll emails to *@{DOMAIN} → {NOTIFICATION_EMAIL}")
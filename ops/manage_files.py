@@ -3,20 +3,29 @@ File Management for Oriz
 Handles file operations, dist analysis, and asset management
 """
 
-import os
 import sys
 import shutil
-import hashlib
 import json
 from pathlib import Path
-from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent))
-from config import PROJECT_ROOT, DIST_DIR
+from config import PROJECT_ROOT, DIST_DIR, BUNDLE_BUDGET_MODE
+from dist_manifest import get_dist_manifest, invalidate_dist_manifest
+from checksums import get_checksum_cache
+from backup_store import create_snapshot, list_snapshots, prune_snapshots
+from backup_archive import write_archive, extract_file
+from bundle_budget import check_bundle, compare_builds, load_history
+from project_walker import walk_project, iter_tree
+from dedupe import dedupe_report
+from binary_manifest import (
+    DEFAULT_PATH as BINARY_MANIFEST, BinaryManifest, write_binary_manifest,
+    json_to_binary, binary_to_json, compare_with_dist,
+)
+from asset_refs import check_references, collect_references, inject_sri, sri_hashes
 
 
 def analyze_dist():
-    """Analyze the dist directory and report file sizes"""
+    """Analyze the dist directory, record its sizes and check bundle budgets"""
     print("\n📊 Dist Directory Analysis")
     print("=" * 60)
 
@@ -24,47 +33,82 @@ def analyze_dist():
         print("❌ Dist directory not found. Run 'npm run build' first.")
         return None
 
-    total_size = 0
-    file_count = 0
-    type_sizes: dict[str, int] = {}
-    files_info = []
+    bundle = check_bundle(DIST_DIR)
+    record = bundle['record']
+    total = record['total']
 
-    for file_path in sorted(DIST_DIR.rglob('*')):
-        if file_path.is_file():
-            size = file_path.stat().st_size
-            total_size += size
-            file_count += 1
-
-            ext = file_path.suffix.lower() or '(none)'
-            type_sizes[ext] = type_sizes.get(ext, 0) + size
-
-            relative = file_path.relative_to(DIST_DIR)
-            files_info.append({
-                'path': str(relative),
-                'size': size,
-                'ext': ext,
-            })
+    def sizes(raw, gz, br):
+        return f"{format_size(raw):>10} {format_size(gz):>10} {format_size(br) if br is not None else '—':>10}"
 
     # Display results
-    print(f"\n  📁 Total files: {file_count}")
-    print(f"  📦 Total size: {format_size(total_size)}")
+    print(f"\n  📁 Total files: {record['file_count']}")
+    print(f"  📦 Total size: {format_size(total['size'])} "
+          f"(gzip {format_size(total['gzip'])}"
+          + (f", brotli {format_size(total['brotli'])})" if total['brotli'] is not None else ")"))
 
-    print(f"\n  📋 By file type:")
-    for ext, size in sorted(type_sizes.items(), key=lambda x: -x[1]):
-        print(f"     {ext:10} {format_size(size):>10}")
+    print(f"\n  📋 By file type:{'raw':>14} {'gzip':>10} {'brotli':>10}")
+    for ext, ext_sizes in sorted(record['by_ext'].items(), key=lambda x: -x[1]['size']):
+        print(f"     {ext:10} {sizes(ext_sizes['size'], ext_sizes['gzip'], ext_sizes['brotli'])}")
 
     print(f"\n  📄 All files:")
-    for info in sorted(files_info, key=lambda x: -x['size']):
-        print(f"     {format_size(info['size']):>10}  {info['path']}")
+    for path, file_sizes in sorted(record['files'].items(), key=lambda x: -x[1][0]):
+        print(f"     {sizes(*file_sizes)}  {path}")
+
+    if bundle['comparison']:
+        print_bundle_comparison(bundle['previous'], record, bundle['comparison'])
+
+    if bundle['violations']:
+        print(f"\n  🚨 Budget exceeded ({BUNDLE_BUDGET_MODE}):")
+        for violation in bundle['violations']:
+            print(f"     ✗ {violation}")
+    else:
+        print(f"\n  ✅ Within bundle budgets")
 
     return {
-        'total_size': total_size,
-        'file_count': file_count,
-        'type_sizes': type_sizes,
-        'files': files_info,
+        'total_size': total['size'],
+        'file_count': record['file_count'],
+        'type_sizes': {ext: s['size'] for ext, s in record['by_ext'].items()},
+        'files': [{'path': path, 'size': fs[0], 'gzip': fs[1], 'brotli': fs[2]}
+                  for path, fs in record['files'].items()],
+        'violations': bundle['violations'],
     }
 
 
+def print_bundle_comparison(previous: dict, current: dict, comparison: dict):
+    """Print size deltas between two builds and the biggest contributors"""
+    def signed(delta):
+        return ('+' if delta >= 0 else '-') + format_size(abs(delta))
+
+    delta = comparison['delta']
+    print(f"\n  📈 Since {previous['timestamp']}: {signed(delta['size'])} raw, {signed(delta['gzip'])} gzip"
+          + (f", {signed(delta['brotli'])} brotli" if delta['brotli'] is not None else ""))
+
+    if comparison['growth']:
+        print(f"\n  🔺 Top growth (gzip):")
+        for c in comparison['growth']:
+            print(f"     {signed(c['gzip']):>10}  {c['path']} ({c['status']})")
+    if comparison['shrink']:
+        print(f"\n  🔻 Top shrink (gzip):")
+        for c in comparison['shrink']:
+            print(f"     {signed(c['gzip']):>10}  {c['path']} ({c['status']})")
+
+
+def bundle_diff(older: int = -2, newer: int = -1):
+    """Compare two builds from the bundle history (indexes, negative from the end)"""
+    history = load_history()
+    try:
+        previous, current = history[older], history[newer]
+    except IndexError:
+        print(f"❌ Bundle history has {len(history)} builds")
+        return None
+
+    comparison = compare_builds(previous, current)
+    print(f"\n📊 Bundle diff: {previous['timestamp']} → {current['timestamp']}")
+    print("=" * 60)
+    print_bundle_comparison(previous, current, comparison)
+    return comparison
+
+
 def verify_build_integrity():
     """Verify the build output contains expected files"""
     print("\n🔍 Build Integrity Check")
@@ -82,27 +126,27 @@ def verify_build_integrity():
     ]
 
     all_ok = True
+    manifest = get_dist_manifest()
 
     for filename in required_files:
-        filepath = DIST_DIR / filename
-        if filepath.exists():
-            print(f"  ✅ {filename} ({format_size(filepath.stat().st_size)})")
+        entry = manifest.get(filename)
+        if entry:
+            print(f"  ✅ {filename} ({format_size(entry.size)})")
         else:
             print(f"  ❌ {filename} — MISSING")
             all_ok = False
 
     for dirname in expected_dirs:
-        dirpath = DIST_DIR / dirname
-        if dirpath.exists() and dirpath.is_dir():
-            count = sum(1 for _ in dirpath.rglob('*') if _.is_file())
+        count = len(manifest.under(dirname))
+        if count:
             print(f"  ✅ {dirname}/ ({count} files)")
         else:
             print(f"  ⚠️ {dirname}/ — not found (may be OK if no assets)")
 
     # Check index.html contains essential elements
-    index_html = DIST_DIR / 'index.html'
-    if index_html.exists():
-        content = index_html.read_text(encoding='utf-8')
+    index_html = manifest.get('index.html')
+    if index_html:
+        content = index_html.abs_path.read_text(encoding='utf-8')
         checks = [
             ('<meta', 'Meta tags'),
             ('og:title', 'Open Graph'),
@@ -117,6 +161,22 @@ def verify_build_integrity():
                 print(f"  ⚠️ {label} NOT found in index.html")
                 all_ok = False
 
+    # Every local asset referenced from HTML/CSS must exist in dist
+    refs = check_references(DIST_DIR)
+    local = [r for r in refs['references'] if r.path is not None]
+    if refs['missing']:
+        print(f"  ❌ {len(refs['missing'])} of {len(local)} asset references are broken:")
+        for r in refs['missing']:
+            print(f"     {r.source} → {r.url} ({r.kind})")
+        all_ok = False
+    else:
+        print(f"  ✅ All {len(local)} asset references resolve")
+
+    # The shipped checksums.json must still describe dist
+    if manifest.get('checksums.json') and BINARY_MANIFEST.exists():
+        if not check_checksums(manifest):
+            all_ok = False
+
     if all_ok:
         print("\n✅ Build integrity check passed!")
     else:
@@ -125,6 +185,30 @@ def verify_build_integrity():
     return all_ok
 
 
+def check_checksums(manifest=None) -> bool:
+    """Compare dist with the checksums index written by --checksums"""
+    manifest = manifest or get_dist_manifest()
+    try:
+        with BinaryManifest(BINARY_MANIFEST) as index:
+            diff = compare_with_dist(index, manifest)
+    except ValueError as e:
+        print(f"  ⚠️ Checksums index unreadable ({e}); run --checksums")
+        return False
+
+    # checksums.json can't describe itself; ignore it on both sides
+    diff = {kind: [p for p in paths if p != 'checksums.json'] for kind, paths in diff.items()}
+    stale = sum(len(paths) for paths in diff.values())
+    if not stale:
+        print(f"  ✅ checksums.json matches all {len(manifest) - 1} files")
+        return True
+
+    print(f"  ❌ checksums.json is stale: {len(diff['changed'])} changed, "
+          f"{len(diff['added'])} added, {len(diff['missing'])} missing — run --checksums")
+    for path in (diff['changed'] + diff['added'] + diff['missing'])[:10]:
+        print(f"     {path}")
+    return False
+
+
 def generate_checksums():
     """Generate SHA256 checksums for all dist files"""
     print("\n🔐 Generating checksums...")
@@ -133,26 +217,83 @@ def generate_checksums():
         print("❌ Dist directory not found")
         return {}
 
-    checksums = {}
+    cache = get_checksum_cache()
+    cache.reset_stats()
 
-    for file_path in sorted(DIST_DIR.rglob('*')):
-        if file_path.is_file():
-            sha256 = hashlib.sha256()
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(8192), b''):
-                    sha256.update(chunk)
+    manifest = get_dist_manifest()
+    manifest.hash_all()
+    checksums = {f.path: f.digest('sha256') for f in manifest}
 
-            relative = str(file_path.relative_to(DIST_DIR))
-            checksums[relative] = sha256.hexdigest()
+    if cache.hits or cache.misses:
+        print(f"  ♻️ Checksum cache: {cache.hit_ratio:.0%} hit ratio "
+              f"({cache.hits} cached, {cache.misses} hashed)")
 
     # Save checksums file
     checksums_file = DIST_DIR / 'checksums.json'
     checksums_file.write_text(json.dumps(checksums, indent=2), encoding='utf-8')
-    print(f"  ✅ Saved {len(checksums)} checksums to checksums.json")
+    write_binary_manifest({f.path: (f.digest('sha256'), f.size) for f in manifest}, BINARY_MANIFEST)
+    invalidate_dist_manifest()
+    print(f"  ✅ Saved {len(checksums)} checksums to checksums.json "
+          f"(binary index: {BINARY_MANIFEST.relative_to(PROJECT_ROOT)})")
 
     return checksums
 
 
+def generate_sri(inject: bool = False):
+    """Print Subresource Integrity hashes, optionally adding them to the HTML"""
+    print("\n🔐 Subresource Integrity")
+    print("=" * 60)
+
+    manifest = get_dist_manifest()
+    references = collect_references(manifest)
+    hashes = sri_hashes(manifest, references)
+
+    for path, integrity in sorted(hashes.items()):
+        print(f"  {path}\n     {integrity}")
+
+    if inject:
+        changed = inject_sri(manifest, references)
+        print(f"\n  ✅ Added integrity to {changed} tags")
+    return hashes
+
+
+def report_duplicates():
+    """Report identical files in dist and content reused from the previous build"""
+    print("\n🧬 Duplicate Assets")
+    print("=" * 60)
+
+    if not DIST_DIR.exists():
+        print("❌ Dist directory not found")
+        return None
+
+    report = dedupe_report(DIST_DIR)
+
+    if report['duplicates']:
+        wasted = sum(g['wasted'] for g in report['duplicates'])
+        print(f"\n  ⚠️ {len(report['duplicates'])} groups of identical files "
+              f"({format_size(wasted)} shipped more than once):")
+        for group in report['duplicates']:
+            print(f"     {format_size(group['size']):>10} × {len(group['paths'])}")
+            for path in group['paths']:
+                print(f"        {path}")
+    else:
+        print("\n  ✅ No duplicate files in dist")
+
+    reuse = report['reuse']
+    if reuse:
+        print(f"\n  ♻️ Reuse vs backup {reuse['snapshot']}: {reuse['reuse_ratio']:.0%} "
+              f"({reuse['reused_files']} files, {format_size(reuse['reused_bytes'])} unchanged; "
+              f"{format_size(reuse['new_bytes'])} new)")
+        if reuse['renamed']:
+            print(f"\n  🔁 Same content under a new name:")
+            for old_path, new_path, size in reuse['renamed']:
+                print(f"     {format_size(size):>10}  {old_path} → {new_path}")
+    else:
+        print("\n  ℹ️ No earlier backup to compare with (run --backup after each build)")
+
+    return report
+
+
 def clean_build():
     """Remove dist, node_modules/.cache, and other build artifacts"""
     print("\n🧹 Cleaning build artifacts...")
@@ -163,10 +304,6 @@ def clean_build():
         PROJECT_ROOT / 'node_modules' / '.cache',
     ]
 
-    files_to_clean = [
-        PROJECT_ROOT / 'vercel.json',  # Auto-generated by deploy_vercel
-    ]
-
     for dirpath in dirs_to_clean:
         if dirpath.exists():
             try:
@@ -175,59 +312,90 @@ def clean_build():
             except Exception as e:
                 print(f"  ⚠️ Could not remove {dirpath}: {e}")
 
-    for filepath in files_to_clean:
-        if filepath.exists():
-            try:
-                filepath.unlink()
-                print(f"  ✅ Removed {filepath.relative_to(PROJECT_ROOT)}")
-            except Exception as e:
-                print(f"  ⚠️ Could not remove {filepath}: {e}")
-
     print("  ✅ Clean complete")
 
 
 def backup_dist():
-    """Create a timestamped backup of the dist directory"""
+    """Snapshot dist into the content-addressed backup store"""
     if not DIST_DIR.exists():
         print("❌ Nothing to backup — dist not found")
         return None
 
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_dir = PROJECT_ROOT / 'backups' / f'dist_{timestamp}'
-    backup_dir.parent.mkdir(parents=True, exist_ok=True)
-
     try:
-        shutil.copytree(DIST_DIR, backup_dir)
-        print(f"✅ Backup created: {backup_dir.relative_to(PROJECT_ROOT)}")
-        return str(backup_dir)
+        snapshot = create_snapshot(DIST_DIR)
+        if snapshot.get('unchanged'):
+            print(f"✅ Dist unchanged since backup {snapshot['id']}")
+            return snapshot['id']
+
+        print(f"✅ Backup created: {snapshot['id']} "
+              f"({snapshot['file_count']} files, {snapshot['new_blobs']} new blobs)")
+
+        removed, blobs = prune_snapshots()
+        if removed:
+            print(f"   🧹 Pruned {removed} old backups ({blobs} unreferenced blobs)")
+        return snapshot['id']
     except Exception as e:
         print(f"❌ Backup failed: {e}")
         return None
 
 
-def list_project_structure():
-    """List the project file structure with sizes"""
-    print(f"\n📁 Project Structure: {PROJECT_ROOT.name}")
+def list_backups():
+    """List backup snapshots, newest first"""
+    print("\n🗄️ Backups")
     print("=" * 60)
 
-    ignore_dirs = {'.git', 'node_modules', 'dist', '.vite', 'backups', '__pycache__'}
+    snapshots = list_snapshots()
+    if not snapshots:
+        print("  No backups yet")
+        return []
+
+    for s in reversed(snapshots):
+        print(f"  {s['id']:20} {s['file_count']:5} files  {format_size(s['total_size']):>10}")
+    return snapshots
 
-    for root, dirs, files in os.walk(PROJECT_ROOT):
-        # Filter ignored directories
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
 
-        level = len(Path(root).relative_to(PROJECT_ROOT).parts)
-        indent = "  " * level
-        folder_name = Path(root).name
-        if level == 0:
-            folder_name = PROJECT_ROOT.name
-        print(f"{indent}📂 {folder_name}/")
+def archive_backup(snapshot_id: str | None = None):
+    """Write a backup snapshot as a compressed tar archive"""
+    try:
+        archive = write_archive(snapshot_id)
+        print(f"✅ Archive written: {archive.relative_to(PROJECT_ROOT)} "
+              f"({format_size(archive.stat().st_size)})")
+        return archive
+    except Exception as e:
+        print(f"❌ Archive failed: {e}")
+        return None
+
+
+def extract_from_archive(archive: str, path: str, dest: str | None = None):
+    """Restore a single file from a backup archive"""
+    try:
+        out = extract_file(Path(archive), path, Path(dest or Path(path).name))
+        print(f"✅ Extracted {path} → {out}")
+        return out
+    except Exception as e:
+        print(f"❌ Extract failed: {e}")
+        return None
+
+
+def list_project_structure(max_depth: int | None = None, as_json: bool = False):
+    """List the project tree with per-directory size rollups, honouring .gitignore"""
+    tree = walk_project(PROJECT_ROOT, max_depth=max_depth)
+
+    if as_json:
+        print(json.dumps(tree, indent=2))
+        return tree
+
+    print(f"\n📁 Project Structure: {PROJECT_ROOT.name}")
+    print("=" * 60)
+
+    for depth, node in iter_tree(tree):
+        indent = "  " * depth
+        if node['type'] == 'dir':
+            print(f"{indent}📂 {node['name']}/ ({format_size(node['size'])}, {node['files']} files)")
+        else:
+            print(f"{indent}📄 {node['name']} ({format_size(node['size'])})")
 
-        sub_indent = "  " * (level + 1)
-        for file in sorted(files):
-            filepath = Path(root) / file
-            size = filepath.stat().st_size
-            print(f"{sub_indent}📄 {file} ({format_size(size)})")
+    return tree
 
 
 def format_size(size_bytes: int) -> str:
@@ -249,21 +417,60 @@ if __name__ == '__main__':
 
     if '--analyze' in args:
         analyze_dist()
+    elif '--bundle-diff' in args:
+        rest = [int(a) for a in args[args.index('--bundle-diff') + 1:][:2]]
+        bundle_diff(*rest)
     elif '--verify' in args:
         verify_build_integrity()
     elif '--checksums' in args:
         generate_checksums()
+    elif '--manifest-bin' in args:
+        rest = args[args.index('--manifest-bin') + 1:]
+        source = Path(rest[0]) if rest else DIST_DIR / 'checksums.json'
+        out = Path(rest[1]) if len(rest) > 1 else BINARY_MANIFEST
+        sizes = {f.path: f.size for f in get_dist_manifest()} if DIST_DIR.exists() else None
+        print(f"✅ Wrote {json_to_binary(source, out, sizes)}")
+    elif '--manifest-json' in args:
+        rest = args[args.index('--manifest-json') + 1:]
+        if len(rest) < 2:
+            print("Usage: python manage_files.py --manifest-json <manifest.bin> <out.json>")
+            sys.exit(1)
+        print(f"✅ Wrote {binary_to_json(Path(rest[0]), Path(rest[1]))}")
+    elif '--sri' in args:
+        generate_sri(inject='--inject' in args)
     elif '--clean' in args:
         clean_build()
+    elif '--dedupe' in args:
+        report_duplicates()
+    elif '--backups' in args:
+        list_backups()
     elif '--backup' in args:
         backup_dist()
+    elif '--archive' in args:
+        rest = args[args.index('--archive') + 1:]
+        archive_backup(rest[0] if rest else None)
+    elif '--extract' in args:
+        rest = args[args.index('--extract') + 1:]
+        if len(rest) < 2:
+            print("Usage: python manage_files.py --extract <archive> <path> [dest]")
+            sys.exit(1)
+        extract_from_archive(*rest[:3])
     elif '--structure' in args:
-        list_project_structure()
+        depth = int(args[args.index('--depth') + 1]) if '--depth' in args else None
+        list_project_structure(max_depth=depth, as_json='--json' in args)
     else:
         print("\nUsage:")
         print("  python manage_files.py --analyze      Analyze dist directory")
+        print("  python manage_files.py --bundle-diff [a b]  Compare two builds in the size history")
         print("  python manage_files.py --verify       Verify build integrity")
         print("  python manage_files.py --checksums    Generate file checksums")
+        print("  python manage_files.py --manifest-bin [json] [out]  Convert checksums.json to the binary index")
+        print("  python manage_files.py --manifest-json <bin> <out>   Convert a binary index back to JSON")
+        print("  python manage_files.py --sri [--inject]  SRI hashes for scripts/stylesheets")
         print("  python manage_files.py --clean        Clean build artifacts")
         print("  python manage_files.py --backup       Backup dist directory")
-        print("  python manage_files.py --structure    List project structure")
+        print("  python manage_files.py --dedupe       Find duplicate assets and cross-build reuse")
+        print("  python manage_files.py --backups      List backups")
+        print("  python manage_files.py --archive [id] Archive a backup as tar.zst/tar.gz")
+        print("  python manage_files.py --extract <archive> <path> [dest]  Restore one file")
+        print("  python manage_files.py --structure [--depth N] [--json]  List project structure")
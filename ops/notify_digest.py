@@ -0,0 +1,181 @@
+"""
+Notification coalescing for Oriz
+Deploy reports inside a window are held and sent together as one digest.
+The first report after a quiet period goes out straight away, as does any
+change from what the last email said (a new failure or a recovery). Repeat
+failures within the window are folded into the digest, so a flapping
+platform can't cause an email storm; the digest goes out when the window
+closes (see manage_email's scheduled flush) or with the next report.
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR, NOTIFY_DIGEST_WINDOW
+
+STATE_FILE = CACHE_DIR / 'notify_digest.json'
+LOCK_FILE = CACHE_DIR / 'notify_digest.lock'
+MAX_PENDING = 100   # oldest held runs are dropped beyond this
+
+
+@contextmanager
+def _locked():
+    """Hold an exclusive lock on the digest state, across processes
+
+    Deploy runs and the scheduled flusher both load, change and save the
+    state; without the lock two of them could release the same runs.
+    """
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, 'a+b') as f:
+        if sys.platform == 'win32':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _load() -> dict:
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        state = {}
+    state.setdefault('last_sent', None)
+    state.setdefault('last_alert', {})
+    state.setdefault('pending', [])
+    state.setdefault('reported', {})     # platform → ok, as of the last email
+    state.setdefault('flush_due', None)  # when the held digest should go out
+    state.setdefault('flush_scheduled', None)
+    return state
+
+
+def _save(state: dict):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, indent=2), encoding='utf-8')
+    tmp.replace(STATE_FILE)
+
+
+def _release(state: dict, now: float) -> list[dict]:
+    """Take every pending run for sending and note which failures were alerted"""
+    runs, state['pending'] = state['pending'], []
+    state['last_sent'] = now
+    state['flush_due'] = state['flush_scheduled'] = None
+    for run in runs:
+        for platform, ok in run['results'].items():
+            state['reported'][platform] = ok
+            if not ok:
+                state['last_alert'][platform] = now
+    return runs
+
+
+def add_run(results: dict, durations: dict | None = None,
+            window: float = NOTIFY_DIGEST_WINDOW, now: float | None = None,
+            perf: dict | None = None, hold: bool = False) -> list[dict] | None:
+    """Record a deploy run; returns the runs to report now, or None to hold it
+
+    Each run is {'time', 'results': {platform: ok}, 'durations': {platform: s},
+    'perf': deploy_metrics report or None}. With hold, the run is always
+    held (e.g. while there is no way to send email).
+    """
+    now = time.time() if now is None else now
+    with _locked():
+        state = _load()
+        state['pending'].append({'time': now, 'results': results, 'durations': durations or {}, 'perf': perf})
+        del state['pending'][:-MAX_PENDING]
+
+        quiet = state['last_sent'] is None or now - state['last_sent'] >= window
+        new_failure = any(
+            not ok and now - state['last_alert'].get(platform, float('-inf')) >= window
+            for platform, ok in results.items()
+        )
+        recovered = any(ok and state['reported'].get(platform) is False for platform, ok in results.items())
+
+        if hold:
+            runs = None
+        elif window <= 0 or quiet or new_failure or recovered:
+            runs = _release(state, now)
+        else:
+            runs = None
+            state['flush_due'] = state['last_sent'] + window
+        _save(state)
+    return runs
+
+
+def flush(now: float | None = None, due: float | None = None) -> list[dict]:
+    """Release held runs regardless of the window (e.g. from cron)
+
+    With due, only the digest scheduled for that time, once it has passed.
+    """
+    now = time.time() if now is None else now
+    with _locked():
+        state = _load()
+        if not state['pending']:
+            return []
+        if due is not None and (state['flush_due'] != due or now < due):
+            return []
+        runs = _release(state, now)
+        _save(state)
+    return runs
+
+
+def held_runs() -> list[dict]:
+    """The runs currently held, without releasing them"""
+    return _load()['pending']
+
+
+def flush_due() -> float | None:
+    """When the held digest should be sent, or None if nothing is held"""
+    state = _load()
+    return state['flush_due'] if state['pending'] else None
+
+
+def claim_flush_schedule() -> float | None:
+    """Mark the held digest's flush as scheduled; returns its due time
+
+    Returns None if nothing is held or a flush for that time is already
+    scheduled, so each window gets one scheduled flush.
+    """
+    with _locked():
+        state = _load()
+        due = state['flush_due'] if state['pending'] else None
+        if due is None or state['flush_scheduled'] == due:
+            return None
+        state['flush_scheduled'] = due
+        _save(state)
+    return due
+
+
+def summarize(runs: list[dict]) -> dict:
+    """Per-platform totals across runs: {platform: {'ok', 'runs', 'avg', 'max', 'last'}}"""
+    summary: dict[str, dict] = {}
+    for run in runs:
+        for platform, ok in run['results'].items():
+            entry = summary.setdefault(platform, {'ok': 0, 'runs': 0, 'durations': [], 'last': ok})
+            entry['runs'] += 1
+            entry['ok'] += bool(ok)
+            entry['last'] = ok
+            if platform in run['durations']:
+                entry['durations'].append(run['durations'][platform])
+
+    for entry in summary.values():
+        durations = entry.pop('durations')
+        entry['avg'] = sum(durations) / len(durations) if durations else None
+        entry['max'] = max(durations) if durations else None
+    return summary
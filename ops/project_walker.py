@@ -0,0 +1,176 @@
+"""
+Project walker for Oriz
+Walks the checkout with os.scandir, skipping anything .gitignore excludes,
+and rolls file sizes up into every directory
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import PROJECT_ROOT
+
+# Always skipped, as if listed in a top-level .gitignore
+DEFAULT_IGNORES = ('.git/', 'node_modules/', 'dist/', '.vite/', 'backups/', '__pycache__/')
+
+
+def _translate(pattern: str) -> str:
+    """Regex source for a gitignore glob (without anchoring)"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(r'\[')
+            else:
+                cls = pattern[i + 1:end]
+                if cls[0] in '!^':
+                    cls = '^' + cls[1:]
+                out.append('[' + cls.replace('\\', '\\\\') + ']')
+                i = end + 1
+                continue
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class GitIgnore:
+    """Compiled patterns from one .gitignore, relative to its directory
+
+    Patterns without a slash match an entry's name at any depth; the rest
+    are anchored to the directory the .gitignore lives in.
+    """
+
+    def __init__(self, lines):
+        # (regex, negated, dir_only, match_name), in file order
+        self.rules = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            match_name = '/' not in line
+            regex = re.compile(_translate(line.lstrip('/')) + r'\Z')
+            self.rules.append((regex, negated, dir_only, match_name))
+
+    @classmethod
+    def load(cls, directory: str) -> 'GitIgnore | None':
+        try:
+            with open(os.path.join(directory, '.gitignore'), encoding='utf-8', errors='replace') as f:
+                ignore = cls(f)
+        except OSError:
+            return None
+        return ignore if ignore.rules else None
+
+    def match(self, rel_path: str, name: str, is_dir: bool) -> bool | None:
+        """True if ignored, False if re-included, None if no pattern applies"""
+        for regex, negated, dir_only, match_name in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(name if match_name else rel_path):
+                return not negated
+        return None
+
+
+def _is_ignored(layers: list, rel_parts: list[str], name: str, is_dir: bool) -> bool:
+    """Deepest .gitignore with an opinion wins, as in git"""
+    for depth, ignore in reversed(layers):
+        rel_path = '/'.join(rel_parts[depth:] + [name])
+        verdict = ignore.match(rel_path, name, is_dir)
+        if verdict is not None:
+            return verdict
+    return False
+
+
+def walk_project(root: Path = PROJECT_ROOT, max_depth: int | None = None,
+                 extra_ignores: tuple[str, ...] = DEFAULT_IGNORES) -> dict:
+    """Return the project tree as nested dicts with per-directory size rollups
+
+    Each node has 'name', 'path', 'type' and 'size'; directories also carry
+    'files' (count, recursive) and 'children'. Directories below max_depth
+    are still walked so their sizes roll up, but their children are omitted.
+    """
+    base = [(0, GitIgnore(extra_ignores))] if extra_ignores else []
+
+    def walk(directory: str, rel_parts: list[str], layers: list, depth: int) -> dict:
+        own = GitIgnore.load(directory)
+        if own:
+            layers = layers + [(len(rel_parts), own)]
+
+        node = {
+            'name': rel_parts[-1] if rel_parts else Path(directory).name,
+            'path': '/'.join(rel_parts),
+            'type': 'dir',
+            'size': 0,
+            'files': 0,
+            'children': [],
+        }
+
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return node
+
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if _is_ignored(layers, rel_parts, entry.name, is_dir):
+                continue
+
+            if is_dir:
+                child = walk(entry.path, rel_parts + [entry.name], layers, depth + 1)
+                node['files'] += child['files']
+            else:
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                child = {'name': entry.name, 'path': '/'.join(rel_parts + [entry.name]),
+                         'type': 'file', 'size': size}
+                node['files'] += 1
+
+            node['size'] += child['size']
+            if max_depth is None or depth < max_depth:
+                node['children'].append(child)
+
+        return node
+
+    return walk(str(root), [], base, 0)
+
+
+def iter_tree(node: dict, depth: int = 0):
+    """Yield (depth, node) for a walked tree, directories before their contents"""
+    yield depth, node
+    for child in node.get('children', []):
+        yield from iter_tree(child, depth + 1)
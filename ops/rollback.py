@@ -0,0 +1,123 @@
+"""
+Rollback for Oriz
+Re-deploys a backup snapshot to every enabled platform, sending only what
+differs from what each platform currently serves
+"""
+
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import CACHE_DIR, DIST_DIR
+from backup_store import list_snapshots, load_snapshot, restore_snapshot
+from deploy_plan import get_platform_modules
+from deploy_state import dist_content_hash, record_deploy
+from dist_manifest import get_dist_manifest
+
+
+def pick_snapshot(snapshot_id: str | None = None) -> str | None:
+    """Return the requested snapshot, or the newest one that differs from dist"""
+    snapshots = list_snapshots()
+    if not snapshots:
+        return None
+
+    if snapshot_id:
+        return snapshot_id if any(s['id'] == snapshot_id for s in snapshots) else None
+
+    if not DIST_DIR.exists():
+        return snapshots[-1]['id']
+
+    manifest = get_dist_manifest()
+    manifest.hash_all()
+    current = {f.path: f.digest('sha256') for f in manifest}
+
+    for s in reversed(snapshots):
+        files = load_snapshot(s['id'])['files']
+        if {path: info['sha256'] for path, info in files.items()} != current:
+            return s['id']
+
+    return None
+
+
+def _rollback_platform(name: str, platform: str, module, source: Path) -> bool:
+    """Diff one platform against the snapshot and re-deploy if needed"""
+    plan = module.plan_deploy(source)
+    changes = len(plan['added']) + len(plan['modified']) + len(plan['deleted'])
+
+    # Only trust "nothing to do" when the platform listed its files
+    if plan['exact'] and changes == 0 and plan['upload_files'] == 0:
+        print(f"   {name}: already serving this snapshot")
+        record_deploy(platform, dist_content_hash(source))
+        return True
+
+    print(f"   {name}: +{len(plan['added'])} ~{len(plan['modified'])} -{len(plan['deleted'])} files, "
+          f"{plan['upload_bytes']} bytes to upload")
+
+    if not module.deploy_dir(source):
+        return False
+
+    record_deploy(platform, dist_content_hash(source))
+    return True
+
+
+def rollback(snapshot_id: str | None = None) -> bool:
+    """Roll every enabled platform back to a backup snapshot"""
+    print("=" * 60)
+    print("⏪ Oriz Rollback")
+    print("=" * 60)
+
+    snapshot_id = pick_snapshot(snapshot_id)
+    if not snapshot_id:
+        print("❌ No suitable snapshot found (see manage_files.py --backups)")
+        return False
+
+    print(f"\n📦 Snapshot: {snapshot_id}")
+
+    # Hardlinked from the blob store, so this costs almost nothing
+    source = CACHE_DIR / 'rollback' / snapshot_id
+    shutil.rmtree(source, ignore_errors=True)
+    restore_snapshot(snapshot_id, source)
+
+    platforms = get_platform_modules()
+    if not platforms:
+        print("⚠️ No deployment platforms enabled!")
+        return False
+
+    print(f"\n🚀 Rolling back: {', '.join(platforms)}")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
+        futures = {
+            executor.submit(_rollback_platform, name, platform, module, source): name
+            for name, (platform, module) in platforms.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"   ❌ {name}: {e}")
+                results[name] = False
+
+    # Verify the mirrors are serving again
+    from final_check import check_http
+    health = check_http()
+
+    print("\n" + "=" * 60)
+    print("📊 Rollback Summary")
+    print("=" * 60)
+    for name, ok in results.items():
+        print(f"   {name}: {'✅ Rolled back' if ok else '❌ Failed'}")
+
+    healthy = sum(1 for ok in health.values() if ok)
+    print(f"\n   Health: {healthy}/{len(health)} mirrors reachable")
+
+    return all(results.values()) and healthy == len(health)
+
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    success = rollback(args[0] if args else None)
+    sys.exit(0 if success else 1)
@@ -7,6 +7,7 @@ Run with: python ops/run_all.py
 import sys
 import os
 import io
+import time
 from pathlib import Path
 
 # Force UTF-8 output on Windows
@@ -18,9 +19,11 @@ sys.path.insert(0, str(Path(__file__).parent))
 from config import (
     CLOUDFLARE, NETLIFY, VERCEL, SURGE, NEOCITIES,
     SPACESHIP, EMAIL, DOMAIN,
-    PROJECT_ROOT, DIST_DIR, get_enabled_platforms
+    PROJECT_ROOT, DIST_DIR, BUNDLE_BUDGET_MODE, get_enabled_platforms
 )
 from build import build_project, ensure_dist_exists, clean_dist
+from deploy_state import deploy_if_changed
+from deploy_metrics import begin, end, record_build, build_report, save_report, format_platform
 
 
 def section(title: str):
@@ -45,6 +48,10 @@ def run_all():
     results = {
         'build': False,
         'deploy': {},
+        'skipped': [],
+        'durations': {},
+        'perf': None,
+        'budget_violations': [],
         'dns_cloudflare': False,
         'dns_spaceship': False,
         'email_routing': False,
@@ -56,15 +63,34 @@ def run_all():
     if ensure_dist_exists(DIST_DIR):
         step("Dist already exists, skipping build")
         results['build'] = True
+        record_build(None)
     else:
         step("Building project...")
         clean_dist(DIST_DIR)
+        started = time.perf_counter()
         results['build'] = build_project(PROJECT_ROOT)
+        record_build(time.perf_counter() - started)
 
     if not results['build']:
         print("\n  [FATAL] Build failed. Cannot proceed.")
         return results
 
+    step("Checking bundle size budgets...")
+    try:
+        from bundle_budget import check_bundle
+        bundle = check_bundle(DIST_DIR)
+        results['budget_violations'] = bundle['violations']
+        if bundle['comparison']:
+            step(f"gzip size {bundle['comparison']['delta']['gzip']:+,} B since last build")
+        for violation in bundle['violations']:
+            print(f"  [BUDGET] {violation}")
+    except Exception as e:
+        print(f"  [ERROR] Bundle budgets: {e}")
+
+    if results['budget_violations'] and BUNDLE_BUDGET_MODE == 'fail':
+        print("\n  [FATAL] Bundle budget exceeded. Not deploying.")
+        return results
+
     # ─── PHASE 2: DEPLOY TO ALL PLATFORMS ─────────────────────
     section("PHASE 2: MULTI-PLATFORM DEPLOYMENT")
 
@@ -75,44 +101,80 @@ def run_all():
         step("No platforms enabled. Set ENABLE_<PLATFORM>=True in .env")
     else:
         if 'cloudflare' in platforms:
+            begin('cloudflare')
             try:
-                from deploy_cf import deploy_to_cloudflare
-                results['deploy']['Cloudflare'] = deploy_to_cloudflare()
+                from deploy_cf import deploy_to_cloudflare, fetch_deployed_hash
+                status = deploy_if_changed('cloudflare', deploy_to_cloudflare, fetch_deployed_hash)
+                results['deploy']['Cloudflare'] = status != 'failed'
+                if status == 'skipped':
+                    results['skipped'].append('Cloudflare')
             except Exception as e:
                 print(f"  [ERROR] Cloudflare: {e}")
                 results['deploy']['Cloudflare'] = False
+            results['durations']['Cloudflare'] = end('cloudflare')
 
         if 'netlify' in platforms:
+            begin('netlify')
             try:
-                from deploy_netlify import deploy_to_netlify
-                results['deploy']['Netlify'] = deploy_to_netlify()
+                from deploy_netlify import deploy_to_netlify, fetch_deployed_hash
+                status = deploy_if_changed('netlify', deploy_to_netlify, fetch_deployed_hash)
+                results['deploy']['Netlify'] = status != 'failed'
+                if status == 'skipped':
+                    results['skipped'].append('Netlify')
             except Exception as e:
                 print(f"  [ERROR] Netlify: {e}")
                 results['deploy']['Netlify'] = False
+            results['durations']['Netlify'] = end('netlify')
 
         if 'vercel' in platforms:
+            begin('vercel')
             try:
-                from deploy_vercel import deploy_to_vercel
-                results['deploy']['Vercel'] = deploy_to_vercel()
+                from deploy_vercel import deploy_to_vercel, fetch_deployed_hash
+                status = deploy_if_changed('vercel', deploy_to_vercel, fetch_deployed_hash)
+                results['deploy']['Vercel'] = status != 'failed'
+                if status == 'skipped':
+                    results['skipped'].append('Vercel')
             except Exception as e:
                 print(f"  [ERROR] Vercel: {e}")
                 results['deploy']['Vercel'] = False
+            results['durations']['Vercel'] = end('vercel')
 
         if 'surge' in platforms:
+            begin('surge')
             try:
                 from deploy_surge import deploy_to_surge
-                results['deploy']['Surge'] = deploy_to_surge()
+                status = deploy_if_changed('surge', deploy_to_surge)
+                results['deploy']['Surge'] = status != 'failed'
+                if status == 'skipped':
+                    results['skipped'].append('Surge')
             except Exception as e:
                 print(f"  [ERROR] Surge: {e}")
                 results['deploy']['Surge'] = False
+            results['durations']['Surge'] = end('surge')
 
         if 'neocities' in platforms:
+            begin('neocities')
             try:
                 from deploy_neocities import deploy_to_neocities
-                results['deploy']['Neocities'] = deploy_to_neocities()
+                status = deploy_if_changed('neocities', deploy_to_neocities)
+                results['deploy']['Neocities'] = status != 'failed'
+                if status == 'skipped':
+                    results['skipped'].append('Neocities')
             except Exception as e:
                 print(f"  [ERROR] Neocities: {e}")
                 results['deploy']['Neocities'] = False
+            results['durations']['Neocities'] = end('neocities')
+
+        statuses = {
+            p: 'skipped' if p in results['skipped'] else 'deployed' if ok else 'failed'
+            for p, ok in results['deploy'].items()
+        }
+        try:
+            results['perf'] = build_report(statuses)
+            report_file = save_report(results['perf'])
+            step(f"Performance report saved to {report_file.name}")
+        except Exception as e:
+            print(f"  [ERROR] Performance report: {e}")
 
     # ─── PHASE 3: CLOUDFLARE DNS ──────────────────────────────
     section("PHASE 3: CLOUDFLARE DNS MANAGEMENT")
@@ -177,7 +239,7 @@ def run_all():
 
     try:
         from manage_email import send_deployment_report
-        send_deployment_report(results['deploy'])
+        send_deployment_report(results['deploy'], results['durations'], perf=results['perf'])
     except Exception as e:
         print(f"  [ERROR] Report: {e}")
 
@@ -185,11 +247,18 @@ def run_all():
     section("FINAL SUMMARY")
 
     print(f"  Build:          {'OK' if results['build'] else 'FAILED'}")
+    budget = f"{len(results['budget_violations'])} EXCEEDED" if results['budget_violations'] else 'OK'
+    print(f"  Bundle budget:  {budget}")
 
     if results['deploy']:
         for platform, success in results['deploy'].items():
-            status = 'OK' if success else 'FAILED'
+            if platform in results['skipped']:
+                status = 'SKIPPED (up to date)'
+            else:
+                status = 'OK' if success else 'FAILED'
             print(f"  Deploy {platform:12s} {status}")
+            if results['perf'] and platform in results['perf']['platforms']:
+                print(f"    {format_platform(results['perf']['platforms'][platform])}")
     else:
         print("  Deploy:         No platforms enabled")
 
@@ -199,7 +268,7 @@ def run_all():
 
     deploy_ok = sum(1 for s in results['deploy'].values() if s)
     deploy_total = len(results['deploy'])
-    print(f"\n  Deployments: {deploy_ok}/{deploy_total} succeeded")
+    print(f"\n  Deployments: {deploy_ok}/{deploy_total} succeeded ({len(results['skipped'])} skipped)")
 
     all_ok = (
         results['build']
@@ -220,9 +289,13 @@ def run_all():
         f"Oriz Deployment Summary",
         f"=======================",
         f"Build: {'OK' if results['build'] else 'FAILED'}",
+        f"Bundle budget: {budget}",
     ]
     for p, s in results['deploy'].items():
-        summary_lines.append(f"Deploy {p}: {'OK' if s else 'FAILED'}")
+        status = 'SKIPPED' if p in results['skipped'] else 'OK' if s else 'FAILED'
+        if results['perf'] and p in results['perf']['platforms']:
+            status += f" ({format_platform(results['perf']['platforms'][p])})"
+        summary_lines.append(f"Deploy {p}: {status}")
     summary_lines.extend([
         f"CF DNS: {'OK' if results['dns_cloudflare'] else 'FAILED/SKIPPED'}",
         f"Spaceship NS: {'OK' if results['dns_spaceship'] else 'FAILED/SKIPPED'}",
@@ -237,6 +310,12 @@ def run_all():
 if __name__ == '__main__':
     results = run_all()
 
+    # The report is sent in the background; give it a moment before exiting.
+    # Anything unsent stays in the outbox for the next run.
+    from mail_outbox import wait_for_outbox
+    if not wait_for_outbox(timeout=30):
+        print("  Report still sending — run python ops/mail_outbox.py --drain later")
+
     # Exit with appropriate code
     deploy_ok = sum(1 for s in results.get('deploy', {}).values() if s)
     deploy_total = len(results.get('deploy', {}))
@@ -0,0 +1,164 @@
+"""
+Subprocess runner for Oriz CLI-based steps
+Runs node tools without a shell, streams prefixed output, supports
+timeouts and cancellation, and is safe to use from parallel deploys
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import PROJECT_ROOT
+
+_print_lock = threading.Lock()
+_running: set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+_cancelled = threading.Event()
+
+
+class CommandResult:
+    """Outcome of a finished command"""
+
+    def __init__(self, returncode: int, output: str, duration: float, timed_out: bool = False):
+        self.returncode = returncode
+        self.output = output
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+@lru_cache(maxsize=None)
+def resolve_binary(name: str) -> tuple[str, ...]:
+    """Resolve a tool to an argv prefix, preferring local node_modules/.bin
+
+    Falls back to a global install, then to npx as a last resort.
+    """
+    bin_dir = PROJECT_ROOT / 'node_modules' / '.bin'
+    local = shutil.which(name, path=str(bin_dir))
+    if local:
+        return (local,)
+
+    found = shutil.which(name)
+    if found:
+        return (found,)
+
+    npx = shutil.which('npx')
+    if npx:
+        return (npx, '--yes', name)
+
+    raise FileNotFoundError(f"{name} not found in node_modules/.bin or PATH")
+
+
+def run_command(
+    name: str,
+    args: list[str],
+    prefix: str = '',
+    cwd: Path = PROJECT_ROOT,
+    env: dict | None = None,
+    timeout: float | None = 600,
+    quiet: bool = False,
+) -> CommandResult:
+    """Run a resolved tool, streaming its output line by line with a prefix
+
+    Raises FileNotFoundError if the tool can't be resolved.
+    """
+    argv = [*resolve_binary(name), *args]
+    label = f"[{prefix}] " if prefix else ''
+    started = time.monotonic()
+
+    if _cancelled.is_set():
+        return CommandResult(-1, '', 0.0)
+
+    # A group of its own lets a timeout or cancel reach npx/npm grandchildren,
+    # which otherwise keep stdout open after the direct child is gone
+    if os.name == 'nt':
+        group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group = {'start_new_session': True}
+
+    process = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        **group,
+    )
+
+    with _running_lock:
+        _running.add(process)
+
+    # Kill the process if it outlives its timeout
+    timed_out = threading.Event()
+
+    def _on_timeout():
+        timed_out.set()
+        _kill_tree(process, force=True)
+
+    timer = threading.Timer(timeout, _on_timeout) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+
+    lines = []
+    try:
+        for line in process.stdout:
+            lines.append(line)
+            if not quiet:
+                with _print_lock:
+                    print(f"   {label}{line.rstrip()}", flush=True)
+        try:
+            returncode = process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _kill_tree(process, force=True)
+            returncode = process.wait(timeout=10)
+    finally:
+        if timer:
+            timer.cancel()
+        process.stdout.close()
+        with _running_lock:
+            _running.discard(process)
+
+    if timed_out.is_set():
+        with _print_lock:
+            print(f"   {label}⏱️ Timed out after {timeout}s")
+
+    return CommandResult(returncode, ''.join(lines), time.monotonic() - started, timed_out.is_set())
+
+
+def cancel_all():
+    """Terminate every running command and refuse to start new ones"""
+    _cancelled.set()
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        _kill_tree(process, force=False)
+
+
+def _kill_tree(process: subprocess.Popen, force: bool):
+    """Signal a command's whole process group, not just the direct child"""
+    # On POSIX the group outlives its leader; on Windows taskkill needs a live pid
+    if os.name == 'nt' and process.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        else:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError, subprocess.TimeoutExpired):
+        pass